@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class CategoricalSampler:
+    """
+    Samples actions from categorical distributions, for one or a batch of agents or environments at once.
+    The uniform random numbers are drawn in advance from a seeded np.random.Generator into a preallocated buffer, which
+    is refilled when it runs out. Without a seed, the generator is seeded from the global numpy random state, so that
+    np.random.seed still makes the agents reproducible. The probabilities don't need to be normalized and aren't
+    validated.
+    Methods:
+    - "inverse cdf": the action is the first one whose cumulative probability exceeds u * total probability
+    - "gumbel": the action is argmax(log(p) + g), g following a Gumbel distribution
+    """
+    def __init__(self, seed=None, method="inverse cdf", buffer_size=4096):
+        if seed is None:
+            seed = np.random.randint(2 ** 32, dtype=np.int64)
+        self.generator = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+        self.method = method
+        self.buffer = np.empty(buffer_size, dtype=np.float64)
+        self.position = buffer_size  # the buffer is filled at the first sampling
+
+    def get_uniforms(self, num_values):
+        """ num_values uniform numbers in [0, 1), taken from the buffer """
+        if num_values > self.buffer.shape[0]:
+            return self.generator.random(num_values)
+        if self.position + num_values > self.buffer.shape[0]:
+            self.generator.random(out=self.buffer)
+            self.position = 0
+        uniforms = self.buffer[self.position:self.position + num_values]
+        self.position += num_values
+        return uniforms
+
+    def get_uniform(self):
+        """ one uniform number in [0, 1), taken from the buffer """
+        if self.position == self.buffer.shape[0]:
+            self.generator.random(out=self.buffer)
+            self.position = 0
+        self.position += 1
+        return self.buffer[self.position - 1]
+
+    def sample(self, probabilities):
+        """
+        :param probabilities: array of shape [num_actions], or [batch_size, num_actions] for a batch
+        :return: the action sampled (int), or an int array of shape [batch_size] for a batch
+        """
+        probabilities = np.asarray(probabilities)
+        if probabilities.ndim > 1:
+            return self.sample_batch(probabilities)
+        if self.method == "gumbel":
+            return int(self.sample_batch(probabilities[np.newaxis])[0])
+        # single distribution: binary search of the threshold in the cumulative probabilities
+        cumulative_probabilities = np.cumsum(probabilities)
+        action = int(cumulative_probabilities.searchsorted(self.get_uniform() * cumulative_probabilities[-1], "right"))
+        return min(action, probabilities.shape[0] - 1)
+
+    def sample_batch(self, probabilities):
+        batch_size, num_actions = probabilities.shape
+        if self.method == "gumbel":
+            uniforms = self.get_uniforms(batch_size * num_actions).reshape(batch_size, num_actions)
+            with np.errstate(divide="ignore"):
+                gumbels = - np.log(- np.log(uniforms))
+                # actions of probability 0 have a log probability of -inf and are never chosen
+                return np.argmax(np.log(probabilities) + gumbels, axis=1)
+
+        cumulative_probabilities = np.cumsum(probabilities, axis=1)
+        thresholds = self.get_uniforms(batch_size) * cumulative_probabilities[:, -1]
+        actions = np.count_nonzero(cumulative_probabilities <= thresholds[:, np.newaxis], axis=1)
+        # rounding errors could lead beyond the last action
+        return np.minimum(actions, num_actions - 1)
@@ -0,0 +1,202 @@
+from DQN.DQN import *
+from functools import partial
+import torch.multiprocessing as mp
+import queue
+import time
+
+
+def make_gym_env(environment_name):
+    # gym is only imported by the processes which use it
+    import gym
+    return gym.make(environment_name)
+
+
+class ApeXActor:
+    """
+    Plays episodes in its own copy of the environment, with a snapshot of the policy of the learner refreshed every
+    policy_refresh_rate steps, and writes the transitions in the shared memory.
+    """
+    def __init__(self, actor_id, params, memory_handles, memory_lock, policy_weights, policy_version, policy_lock):
+        self.actor_id = actor_id
+        self.epsilon = params["actors_epsilons"][actor_id]
+        self.num_actions = params.get("num_actions", 0)
+        self.policy_refresh_rate = params.get("actors_policy_refresh_rate", 400)
+
+        fa_params = params["function_approximator_info"]
+        self.net = CustomNeuralNetwork(fa_params["neural_nets_info"])
+        self.memory = SharedReplayBuffer(fa_params, memory_handles, memory_lock)
+
+        # snapshot of the parameters of the learner eval net, shared by all the actors
+        self.policy_weights = policy_weights
+        self.policy_version = policy_version
+        self.policy_lock = policy_lock
+        self.local_policy_version = -1
+
+    def refresh_policy(self):
+        if self.policy_version.value != self.local_policy_version:
+            # the weights are copied into the parameters of the actor, so that the learner can publish new ones while
+            # the actor plays with these
+            with self.policy_lock, torch.no_grad():
+                offset = 0
+                for parameter in self.net.parameters():
+                    parameter.copy_(self.policy_weights[offset:offset + parameter.numel()].view_as(parameter))
+                    offset += parameter.numel()
+                self.local_policy_version = self.policy_version.value
+
+    def choose_action(self, state):
+        # same strategy as DQNAgent: the greedy action is chosen with probability epsilon
+        if np.random.uniform() < self.epsilon:
+            return int(np.argmax(self.net.act(state)))
+        return np.random.randint(self.num_actions)
+
+    def run(self, make_env, stop_event, results_queue):
+        environment = make_env()
+        num_steps = 0
+        self.refresh_policy()
+        while not stop_event.is_set():
+            state = environment.reset()
+            episode_reward = 0
+            done = False
+            while not done and not stop_event.is_set():
+                action = self.choose_action(state)
+                next_state, reward, done, _ = environment.step(action)
+                self.memory.store_transition(state, action, reward, next_state, done)
+                episode_reward += reward
+                state = next_state
+
+                num_steps += 1
+                if num_steps % self.policy_refresh_rate == 0:
+                    self.refresh_policy()
+            if done:
+                results_queue.put((self.actor_id, episode_reward))
+        self.memory.close()
+
+
+def run_actor(actor_id, params, make_env, memory_handles, memory_lock, policy_weights, policy_version, policy_lock,
+              stop_event, results_queue):
+    # the actors share the cores of the machine, so each one only uses one thread
+    torch.set_num_threads(1)
+    np.random.seed(params.get("seed", 0) + actor_id)
+    torch.manual_seed(params.get("seed", 0) + actor_id)
+    actor = ApeXActor(actor_id, params, memory_handles, memory_lock, policy_weights, policy_version, policy_lock)
+    actor.run(make_env, stop_event, results_queue)
+
+
+class ApeX:
+    """
+    Distributed DQN on a single machine (Horgan et al., Distributed Prioritized Experience Replay): num_actors
+    processes play episodes in their own environments, each one with its own epsilon, and write their transitions in
+    a replay memory in shared memory. The learner, in the main process, trains the DQN from this memory and publishes
+    its eval net to the actors every policy_update_rate updates.
+    The actors' transitions are interleaved in the memory, so the targets are one-step targets.
+    """
+    def __init__(self, params={}, make_env=None):
+        self.num_actors = None
+        self.policy_update_rate = None
+        self.start_method = None
+        self.params = None
+        self.dqn = None
+        # picklable function creating an environment
+        self.make_env = make_env
+
+        # shared between the learner and the actors
+        self.policy_weights = None
+        self.policy_version = None
+        self.policy_lock = None
+
+        self.episodes_rewards = []  # (actor id, episode reward) of the episodes finished by the actors
+
+        self.set_params_from_dict(params)
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params={}):
+        self.num_actors = params.get("num_actors", 4)
+        self.policy_update_rate = params.get("policy_update_rate", 100)
+        self.start_method = params.get("start_method", None)  # None for the default start method of the platform
+        if self.make_env is None:
+            self.make_env = partial(make_gym_env, params.get("environment_name", "CartPole-v0"))
+
+        fa_params = params["function_approximator_info"]
+        fa_params["action_dim"] = params.get("num_actions", 0)
+        fa_params["memory_type"] = "shared"
+        assert fa_params.get("n_steps", 1) == 1, "the transitions of the actors are interleaved in the memory"
+        assert not fa_params.get("cache_target_values", False), \
+            "the transitions are stored by the actors, which can't invalidate the cache of the learner"
+        params.setdefault("actors_epsilons", self.get_actors_epsilons(params.get("actors_exploration", 0.4),
+                                                                      params.get("actors_exploration_alpha", 7)))
+        assert len(params["actors_epsilons"]) == self.num_actors, "there must be one epsilon per actor"
+        self.params = params
+        self.dqn = DQN(fa_params)
+
+    def get_actors_epsilons(self, exploration, alpha):
+        """
+        Ape-X exploration schedule: actor i explores with probability exploration ** (1 + alpha * i / (N - 1)). As in
+        DQNAgent, epsilon is the probability of choosing the greedy action.
+        """
+        exponents = 1 + alpha * np.arange(self.num_actors) / max(self.num_actors - 1, 1)
+        return list(1 - exploration ** exponents)
+
+    def publish_policy(self):
+        with self.policy_lock:
+            self.policy_weights.copy_(torch.nn.utils.parameters_to_vector(self.dqn.eval_net.parameters()).detach())
+            self.policy_version.value += 1
+
+    def collect_results(self, results_queue):
+        while True:
+            try:
+                self.episodes_rewards.append(results_queue.get_nowait())
+            except queue.Empty:
+                return
+
+    # ====== Learning functions =======================================================
+
+    def run(self, num_updates):
+        """
+        Starts the actors, makes num_updates learning updates once enough transitions were stored, then stops the
+        actors
+        :return: the (actor id, episode reward) of the episodes finished by the actors
+        """
+        context = mp.get_context(self.start_method)
+        # the memory lock must come from the same context as the actors
+        self.dqn.memory.lock = context.Lock()
+        self.policy_weights = torch.nn.utils.parameters_to_vector(self.dqn.eval_net.parameters()).detach().clone()
+        self.policy_weights.share_memory_()
+        self.policy_version = context.Value("q", 0)
+        self.policy_lock = context.Lock()
+        stop_event = context.Event()
+        results_queue = context.Queue()
+
+        actors = [context.Process(target=run_actor,
+                                  args=(actor_id, self.params, self.make_env, self.dqn.memory.get_handles(),
+                                        self.dqn.memory.lock, self.policy_weights, self.policy_version,
+                                        self.policy_lock, stop_event, results_queue), daemon=True)
+                  for actor_id in range(self.num_actors)]
+        for actor in actors:
+            actor.start()
+
+        try:
+            num_updates_done = 0
+            while num_updates_done < num_updates:
+                if self.dqn.memory.counter < self.dqn.learning_starts:
+                    time.sleep(0.01)
+                else:
+                    self.dqn.compute_weights()
+                    num_updates_done += 1
+                    if num_updates_done % self.policy_update_rate == 0:
+                        self.publish_policy()
+                self.collect_results(results_queue)
+        finally:
+            stop_event.set()
+            # the queue is emptied while waiting for the actors, which can't end before their results are read
+            while any(actor.is_alive() for actor in actors):
+                self.collect_results(results_queue)
+                time.sleep(0.01)
+            self.collect_results(results_queue)
+            for actor in actors:
+                actor.join()
+
+        return self.episodes_rewards
+
+    def close(self):
+        self.dqn.close()
@@ -0,0 +1,48 @@
+import queue
+import threading
+
+
+class BatchPrefetcher:
+    """
+    Background thread preparing the next batches of transitions while the current gradient steps run.
+    The batches are put in a bounded queue, so they are at most queue_size updates older than the memory. The lock
+    must also be held by whatever modifies the memory while the prefetcher runs.
+    """
+    def __init__(self, sample_function, lock, queue_size=2):
+        self.sample_function = sample_function
+        self.lock = lock
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                with self.lock:
+                    item = self.sample_function()
+            except Exception as exception:
+                # the exception is raised again in the thread getting the batches
+                item = exception
+            # waiting for a free spot in the queue, while regularly checking whether the prefetcher was closed
+            while not self.stop_event.is_set():
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if isinstance(item, Exception):
+                return
+
+    def get(self):
+        item = self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def close(self):
+        """ Stops the thread and waits for it to end """
+        self.stop_event.set()
+        self.thread.join()
+        while not self.queue.empty():
+            self.queue.get_nowait()
@@ -0,0 +1,128 @@
+from DQN.ReplayBuffer import *
+
+
+class CompactReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer storing every observation only once, in a compressed format.
+    Slot k holds an observation and, if a transition starts from it, the action, reward and done flag of that
+    transition: the next state is then the observation of slot k + 1. As consecutive transitions of an episode share
+    their states, an episode of T transitions only uses T + 1 slots. The slot holding the last observation of an
+    episode (or the most recent observation) doesn't start a transition and is never sampled.
+    The observations can be stored as float16, or quantized as int8/int16 with a per-dimension affine mapping of
+    [observation_min; observation_max], and are converted back to float32 when sampled.
+    """
+    QUANTIZED_DTYPES = {"int8": np.int8, "int16": np.int16}
+
+    def __init__(self, params={}):
+        self.observation_dtype = None
+        self.observation_min = None
+        self.observation_max = None
+        self.quantization_scale = None
+        self.quantization_offset = None
+
+        self.observations = None
+        self.is_transition = None  # True for the slots from which a transition starts
+
+        # last next state stored, used to check that the next transition starts from it
+        self.last_next_state = None
+        self.is_last_next_state_terminal = True
+
+        super(CompactReplayBuffer, self).__init__(params)
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params={}):
+        super(CompactReplayBuffer, self).set_params_from_dict(params)
+        self.observation_dtype = params.get("observation_dtype", "float16")  # can also be "float32", "int8", "int16"
+        if self.observation_dtype in self.QUANTIZED_DTYPES:
+            assert "observation_min" in params and "observation_max" in params, \
+                "observation_min and observation_max are needed to quantize the observations"
+            self.observation_min = np.broadcast_to(np.array(params["observation_min"], dtype=np.float32),
+                                                   (self.state_dim,))
+            self.observation_max = np.broadcast_to(np.array(params["observation_max"], dtype=np.float32),
+                                                   (self.state_dim,))
+
+    def allocate_memory(self):
+        if self.observation_dtype in self.QUANTIZED_DTYPES:
+            storage_dtype = self.QUANTIZED_DTYPES[self.observation_dtype]
+            info = np.iinfo(storage_dtype)
+            # x = (q - quantization_offset) * quantization_scale + observation_min
+            self.quantization_scale = (self.observation_max - self.observation_min) / (info.max - info.min)
+            self.quantization_offset = info.min
+        else:
+            storage_dtype = np.dtype(self.observation_dtype)
+        self.observations = np.zeros((self.memory_size, self.state_dim), dtype=storage_dtype)
+        self.actions = np.zeros(self.memory_size, dtype=np.int64)
+        self.rewards = np.zeros(self.memory_size, dtype=np.float32)
+        self.dones = np.zeros(self.memory_size, dtype=np.float32)
+        self.is_transition = np.zeros(self.memory_size, dtype=bool)
+
+    def set_tensors(self):
+        self.actions_tensor = torch.from_numpy(self.actions)
+        self.rewards_tensor = torch.from_numpy(self.rewards)
+        self.dones_tensor = torch.from_numpy(self.dones)
+
+    # ====== Compression functions =======================================================
+
+    def compress(self, observation):
+        if self.quantization_scale is None:
+            return observation
+        quantized = np.rint((np.asarray(observation) - self.observation_min) / self.quantization_scale) + \
+            self.quantization_offset
+        info = np.iinfo(self.observations.dtype)
+        return np.clip(quantized, info.min, info.max)
+
+    def decompress(self, observations):
+        if self.quantization_scale is None:
+            return observations.astype(np.float32)
+        return (observations.astype(np.float32) - self.quantization_offset) * self.quantization_scale + \
+            self.observation_min
+
+    # ====== Memory functions =======================================================
+
+    def write_observation(self, observation):
+        index = self.counter % self.memory_size
+        self.observations[index] = self.compress(observation)
+        self.is_transition[index] = False
+        self.counter += 1
+        return index
+
+    def store_transition(self, state, action, reward, next_state, done=False):
+        # the state is only written if it isn't the next state of the previous transition
+        if not self.is_last_next_state_terminal and np.array_equal(state, self.last_next_state):
+            index = (self.counter - 1) % self.memory_size
+        else:
+            index = self.write_observation(state)
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.dones[index] = done
+        self.write_observation(next_state)
+        self.is_transition[index] = True
+
+        self.last_next_state = np.array(next_state)
+        self.is_last_next_state_terminal = bool(done)
+        return index
+
+    def sample_indices(self, batch_size):
+        indices = np.random.randint(len(self), size=batch_size)
+        # the slots without transition are sampled again
+        is_invalid = ~self.is_transition[indices]
+        while np.any(is_invalid):
+            indices[is_invalid] = np.random.randint(len(self), size=np.count_nonzero(is_invalid))
+            is_invalid = ~self.is_transition[indices]
+        return indices
+
+    def get_next_indices(self, indices):
+        # the next transition of an episode starts from the slot of the next state, if a transition was stored there
+        next_indices = (np.asarray(indices, dtype=np.int64) + 1) % self.memory_size
+        return next_indices, self.is_transition[next_indices]
+
+    def get_batch(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        torch_indices = torch.from_numpy(indices)
+        batch_state = torch.from_numpy(self.decompress(self.observations[indices]))
+        batch_action = self.actions_tensor.index_select(0, torch_indices).unsqueeze(1)
+        batch_reward = self.rewards_tensor.index_select(0, torch_indices).unsqueeze(1)
+        batch_next_state = torch.from_numpy(self.decompress(self.observations[(indices + 1) % self.memory_size]))
+        batch_done = self.dones_tensor.index_select(0, torch_indices).unsqueeze(1)
+        return batch_state, batch_action, batch_reward, batch_next_state, batch_done
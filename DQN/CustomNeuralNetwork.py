@@ -3,60 +3,100 @@ import torch.nn as nn
 import torch.nn.functional as F
 import torch.optim as optim
 import numpy as np
+from InferenceRunner import *
 
 
 class CustomNeuralNetwork(nn.Module):
     """
     Attempt to make an easy-to-use neural net class
+    The layers and their activations are built once into a nn.Sequential, which can also be compiled with TorchScript
+    ("script") or torch.compile ("compile") depending on compile_mode.
     """
+    ACTIVATIONS = {"relu": nn.ReLU, "tanh": nn.Tanh, "softmax": lambda: nn.Softmax(dim=-1)}
+
     def __init__(self, params):
         super(CustomNeuralNetwork, self).__init__()
 
-        self.layers = nn.ModuleList()
+        self.model = None
         self.activations = []
         self.init_layers(params["layers_info"])
         self.optimizer = None
         self.init_optimizer(params["optimizer_info"])
         #optim.Adam(self.parameters(), lr=learning_rate)
+        self.compile_mode = params.get("compile_mode", None)  # None, "script" or "compile"
+        self.compiled_forward = None
+        self.inference_runner = None
+        self.init_compiled_forward()
 
     def init_layers(self, layers_info):
+        modules = []
         for layer_info in layers_info:
             if layer_info["type"] == "linear":
                 layer = nn.Linear(layer_info["input_size"], layer_info["output_size"])
                 layer.weight.data.normal_(0, 0.1) # TODO : I don't think it should be optional, but it might be. See later.
-            self.layers.append(layer)
+            modules.append(layer)
+            # layers without a known activation are linear
+            modules.append(self.ACTIVATIONS.get(layer_info["activation"], nn.Identity)())
             self.activations.append(layer_info["activation"])
+        self.model = nn.Sequential(*modules)
+
+    def init_compiled_forward(self):
+        # the compiled versions share the parameters of the model, and are kept as functions so that the parameters
+        # aren't registered twice
+        if self.compile_mode == "script":
+            self.compiled_forward = torch.jit.script(self.model).forward
+        elif self.compile_mode == "compile":
+            self.compiled_forward = torch.compile(self.model.forward)
+        else:
+            self.compiled_forward = self.model.forward
+        self.inference_runner = InferenceRunner(self.compiled_forward, use_inference_mode=self.compile_mode != "script")
 
     def init_optimizer(self, optimizer_info):
         if optimizer_info["type"] == "adam":
             self.optimizer = optim.Adam(self.parameters(), lr=optimizer_info["learning_rate"])
 
     def forward(self, x):
-        # format the input data
-        if isinstance(x, np.ndarray):
-            x = torch.from_numpy(x).to(torch.float32)
-        elif isinstance(x, list):
-            x = torch.FloatTensor(x)
-        elif isinstance(x, tuple):
-            x = torch.FloatTensor(x)
-
-        for i in range(len(self.layers)):
-            if self.activations[i] == "relu":
-                x = F.relu(self.layers[i](x))
-            elif self.activations[i] == "tanh":
-                x = F.tanh(self.layers[i](x))
-            elif self.activations[i] == "softmax":
-                x = F.softmax(self.layers[i](x))
-            else:
-                x = self.layers[i](x)
+        # format the input data: numpy arrays, lists, tuples and tensors are all converted by as_tensor
+        return self.compiled_forward(torch.as_tensor(x, dtype=torch.float32))
 
-        return x
+    def act(self, state):
+        # output of the network for a single state, as a numpy array, for action choices
+        return self.inference_runner.act(state)
 
     def backpropagate(self, loss):
         self.optimizer.zero_grad()
         loss.backward()  # il faut que la loss ait une seule valeur.
         self.optimizer.step()
 
+    def copy_weights_from(self, network):
+        """
+        Copies in place the parameters and buffers of a network with the same layers, tensor to tensor, without going
+        through a state dict
+        """
+        with torch.no_grad():
+            tensors = list(self.parameters()) + list(self.buffers())
+            source_tensors = list(network.parameters()) + list(network.buffers())
+            if hasattr(torch, "_foreach_copy_"):
+                torch._foreach_copy_(tensors, source_tensors)
+            else:
+                for tensor, source_tensor in zip(tensors, source_tensors):
+                    tensor.copy_(source_tensor)
+
+    def soft_update_from(self, network, tau):
+        """
+        Polyak averaging of the parameters: w <- w + tau * (w_network - w), as one fused operation over all of them.
+        The buffers are copied.
+        """
+        with torch.no_grad():
+            parameters, source_parameters = list(self.parameters()), list(network.parameters())
+            if hasattr(torch, "_foreach_lerp_"):
+                torch._foreach_lerp_(parameters, source_parameters, tau)
+            else:
+                for parameter, source_parameter in zip(parameters, source_parameters):
+                    parameter.lerp_(source_parameter, tau)
+            for buffer, source_buffer in zip(self.buffers(), network.buffers()):
+                buffer.copy_(source_buffer)
+
 if __name__=="__main__":
     params = {
         "layers_info": [
@@ -1,6 +1,13 @@
 from DQN.CustomNeuralNetwork import *
+from DQN.ReplayBuffer import *
+from DQN.PrioritizedReplayBuffer import *
+from DQN.DiskReplayBuffer import *
+from DQN.CompactReplayBuffer import *
+from DQN.SharedReplayBuffer import *
+from DQN.BatchPrefetcher import *
 import numpy as np
 import torch
+import threading
 
 class DQN:
     def __init__(self, params={}):
@@ -9,6 +16,8 @@ class DQN:
         self.eval_net = None
         self.target_net = None
         self.update_target_rate = None
+        self.target_update_type = None  # "hard": copy every update_target_rate steps, "soft": Polyak averaging
+        self.target_update_tau = None
         self.update_target_counter = 0
         self.loss_func = nn.MSELoss()
         # NN dimension parameters
@@ -17,31 +26,78 @@ class DQN:
         # learning parameters
         self.learning_rate = None
         self.discount_factor = None
+        self.n_steps = None  # number of rewards of the returns the targets are computed from
         # memory parameters
         self.memory_size = None
         self.memory = None
-        self.memory_counter = 0
+        self.memory_type = None
         self.batch_size = None
+        self.learning_starts = None  # number of transitions to store before starting to learn
+        # update to data ratio parameters
+        self.train_every = None  # number of calls to compute_weights between two updates
+        self.gradient_steps_per_update = None
+        self.compute_weights_counter = 0
+        # cache of max_a Q_target(s') for every slot of the memory, valid until the next target net update
+        self.cache_target_values = None
+        self.target_values_refresh = None
+        self.target_values = None
+        self.target_values_versions = None  # version of the target net with which each cached value was computed
+        self.target_net_version = 0
+        # background sampling of the batches of the next updates
+        self.prefetch = None
+        self.prefetch_queue_size = None
+        self.prefetcher = None
+        self.memory_lock = threading.Lock()  # held while the memory is modified or sampled
 
         self.set_params_from_dict(params)
 
-        self.set_other_params()
-
     def set_params_from_dict(self, params={}):
         self.state_dim = params.get("state_dim", 4)
         self.action_dim = params.get("action_dim", 2)
         self.memory_size = params.get("memory_size", 200)
         self.update_target_rate = params.get("update_target_rate", 50)
+        self.target_update_type = params.get("target_update_type", "hard")
+        self.target_update_tau = params.get("target_update_tau", 0.005)
         self.batch_size = params.get("batch_size", 128)
         self.discount_factor = params.get("discount_factor", 0.995)
+        self.n_steps = params.get("n_steps", 1)
+        self.learning_starts = params.get("learning_starts", self.memory_size)
+        # can also be "prioritized", "disk", "compact" or "shared"
+        self.memory_type = params.get("memory_type", "uniform")
+        self.train_every = params.get("train_every", 1)
+        self.gradient_steps_per_update = params.get("gradient_steps_per_update", 1)
+        self.cache_target_values = params.get("cache_target_values", False)
+        # "lazy": cached values are computed when first sampled, "full": the whole memory is computed at each update
+        self.target_values_refresh = params.get("target_values_refresh", "lazy")
+        # the target net changes at every step with soft updates, so the cached values would never be used
+        assert not (self.target_update_type == "soft" and self.cache_target_values), \
+            "cache_target_values can't be used with soft target updates"
+        self.prefetch = params.get("prefetch", False)
+        self.prefetch_queue_size = params.get("prefetch_queue_size", 2)
+        # a prefetched transition can be overwritten before being used, which would corrupt the cache of its slot
+        assert not (self.prefetch and self.cache_target_values), \
+            "prefetch can't be used with cache_target_values"
 
         self.initialize_neural_networks(params.get("neural_nets_info"))
+        self.initialize_memory(params)
+        self.initialize_target_values_cache()
 
-        self.set_other_params()
-
+    def initialize_target_values_cache(self):
+        if self.cache_target_values:
+            self.target_values = np.zeros(self.memory_size, dtype=np.float32)
+            self.target_values_versions = np.full(self.memory_size, -1, dtype=np.int64)
 
-    def set_other_params(self):
-        self.memory = np.zeros((self.memory_size, 2 * self.state_dim + 2))
+    def initialize_memory(self, params):
+        if self.memory_type == "prioritized":
+            self.memory = PrioritizedReplayBuffer(params)
+        elif self.memory_type == "disk":
+            self.memory = DiskReplayBuffer(params)
+        elif self.memory_type == "compact":
+            self.memory = CompactReplayBuffer(params)
+        elif self.memory_type == "shared":
+            self.memory = SharedReplayBuffer(params)
+        else:
+            self.memory = ReplayBuffer(params)
 
     def initialize_neural_networks(self, nn_params):
         self.target_net, self.eval_net = CustomNeuralNetwork(nn_params), CustomNeuralNetwork(nn_params)
@@ -55,64 +111,173 @@ class DQN:
             action_value = self.eval_net(state)[action]
         return action_value
 
+    def act(self, state):
+        # action values of a single state from the eval net, as a numpy array, without autograd
+        return self.eval_net.act(state)
+
     # memory related functions ========================================================
 
-    def store_transition(self, state, action, reward, next_state):
+    def store_transition(self, state, action, reward, next_state, done=False):
         # store a transition (SARS') in the memory
-        transition = np.hstack((state, [action, reward], next_state))
-        index = self.memory_counter % self.memory_size
-        self.memory[index, :] = transition
-        self.memory_counter += 1
-
-    def sample_memory(self):
-        # Sampling some indices from memory
-        sample_index = np.random.choice(self.memory_size, self.batch_size)
-        # Getting the batch of samples corresponding to those indices and dividing it into state, action, reward and
-        # next state
-        batch_memory = self.memory[sample_index, :]
-        batch_state = torch.FloatTensor(batch_memory[:, :self.state_dim])
-        batch_action = torch.LongTensor(batch_memory[:, self.state_dim:self.state_dim + 1].astype(int))
-        batch_reward = torch.FloatTensor(batch_memory[:, self.state_dim + 1:self.state_dim + 2])
-        batch_next_state = torch.FloatTensor(batch_memory[:, -self.state_dim:])
-
-        return batch_state, batch_action, batch_reward, batch_next_state
+        with self.memory_lock:
+            index = self.memory.store_transition(state, action, reward, next_state, done)
+        if self.cache_target_values:
+            # the value cached for the previous transition of this slot is not valid anymore
+            self.target_values_versions[index] = -1
+
+    def sample_memory(self, num_batches=1):
+        """
+        Samples batches of transitions among the ones already stored, already divided into state, action, reward,
+        next state and done tensors. All the batches are sampled at once, and then split without copy, except with
+        prioritized memories, whose samples are stratified over the priority mass: each batch is sampled on its own so
+        that it covers the whole mass.
+        :param num_batches: number of batches to sample
+        :return: a list of num_batches tuples (indices, batch, weights). The indices and importance sampling weights
+        are used by prioritized memories. With n-step returns, the batches also hold the discounts of the next states
+        values and the indices of the transitions bootstrapped from (see ReplayBuffer.get_n_step_batch).
+        """
+        if num_batches > 1 and isinstance(self.memory, PrioritizedReplayBuffer):
+            return [self.sample_memory()[0] for _ in range(num_batches)]
+
+        indices, batch, weights = self.memory.sample(self.batch_size * num_batches)
+        if self.n_steps > 1:
+            batch = self.memory.get_n_step_batch(indices, batch, self.n_steps, self.discount_factor)
+        if num_batches == 1:
+            return [(indices, batch, weights)]
+
+        splitted_indices = np.split(indices, num_batches)
+        splitted_batches = zip(*[tensor.split(self.batch_size) for tensor in batch])
+        splitted_weights = [None] * num_batches if weights is None else weights.split(self.batch_size)
+        return list(zip(splitted_indices, splitted_batches, splitted_weights))
+
+    def get_batches(self):
+        """
+        Batches of the gradient steps of an update, sampled by the prefetcher thread if it is used
+        """
+        if not self.prefetch:
+            return self.sample_memory(self.gradient_steps_per_update)
+        if self.prefetcher is None:
+            # the prefetcher is started once the memory holds enough transitions to be sampled
+            self.prefetcher = BatchPrefetcher(lambda: self.sample_memory(self.gradient_steps_per_update),
+                                              self.memory_lock, self.prefetch_queue_size)
+        return self.prefetcher.get()
+
+    def close(self):
+        # stops the prefetcher thread and releases the memory
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+            self.prefetcher = None
+        self.memory.close()
 
     # parameters update functions ==============================================================
 
     def update_target_net(self):
-        # every n learning cycle, the target network will be replaced with the eval network
-        if self.update_target_counter % self.update_target_rate == 0:
-            self.target_net.load_state_dict(self.eval_net.state_dict())
+        if self.target_update_type == "soft":
+            # at every learning cycle, the target network is moved towards the eval network
+            self.target_net.soft_update_from(self.eval_net, self.target_update_tau)
+            self.target_net_version += 1
+        elif self.update_target_counter % self.update_target_rate == 0:
+            # every n learning cycle, the target network will be replaced with the eval network
+            self.target_net.copy_weights_from(self.eval_net)
+            self.target_net_version += 1
+            if self.cache_target_values and self.target_values_refresh == "full":
+                self.refresh_target_values()
         self.update_target_counter += 1
 
-    def compute_loss(self, batch_state, batch_action, batch_reward, batch_next_state):
+    def compute_next_state_values(self, batch_next_state):
+        # max_a Q_target(s', a), of shape [batch_size]
+        with torch.no_grad():
+            return self.target_net(batch_next_state).max(1)[0]
+
+    def get_next_state_values(self, batch_next_state, batch_indices=None):
+        """
+        Computes max_a Q_target(s', a) for a batch of transitions. If the target values are cached, only the ones
+        that weren't computed since the last update of the target net are computed, and they are stored in the cache.
+        :param batch_next_state: pytorch tensor of shape [batch_size, state_dim]
+        :param batch_indices: indices of the transitions in the memory, needed to use the cache
+        :return: pytorch tensor of shape [batch_size, 1]
+        """
+        if not self.cache_target_values or batch_indices is None:
+            return self.compute_next_state_values(batch_next_state).view(-1, 1)
+
+        is_stale = self.target_values_versions[batch_indices] != self.target_net_version
+        if np.any(is_stale):
+            stale_positions = np.flatnonzero(is_stale)
+            stale_next_states = batch_next_state.index_select(0, torch.from_numpy(stale_positions))
+            stale_indices = batch_indices[stale_positions]
+            self.target_values[stale_indices] = self.compute_next_state_values(stale_next_states).numpy()
+            self.target_values_versions[stale_indices] = self.target_net_version
+        return torch.from_numpy(self.target_values[batch_indices]).view(-1, 1)
+
+    def refresh_target_values(self, chunk_size=4096):
+        """
+        Computes the cached target values of the whole memory, in chunks of chunk_size transitions
+        """
+        num_transitions = len(self.memory)
+        for start in range(0, num_transitions, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, num_transitions))
+            batch_next_state = self.memory.get_batch(indices)[3]
+            self.target_values[indices] = self.compute_next_state_values(batch_next_state).numpy()
+            self.target_values_versions[indices] = self.target_net_version
+
+    def compute_loss(self, batch_state, batch_action, batch_reward, batch_next_state, batch_done, batch_weights=None,
+                     batch_indices=None, batch_discounts=None):
         """
         Compute the loss
         :param batch_state: pytorch tensor of shape [batch_size, state_dim]
         :param batch_action: pytorch tensor of shape [batch_size, 1]
-        :param batch_reward: pytorch tensor of shape [batch_size, 1]
+        :param batch_reward: pytorch tensor of shape [batch_size, 1], the rewards or the n-step returns
         :param batch_next_state: pytorch tensor of shape [batch_size, state_dim]
-        :return:
+        :param batch_done: pytorch tensor of shape [batch_size, 1], 1 for the transitions ending an episode
+        :param batch_weights: pytorch tensor of shape [batch_size, 1] of importance sampling weights, or None
+        :param batch_indices: indices in the memory of the transitions whose next states are batch_next_state, used by
+        the target values cache
+        :param batch_discounts: pytorch tensor of shape [batch_size, 1] of the discounts of the next states values, or
+        None to use the discount factor
+        :return: the loss and the TD errors of the batch, of shape [batch_size, 1]
         """
         q_eval = self.eval_net(batch_state).gather(1, batch_action)
-        q_next = self.target_net(batch_next_state).detach()
-        q_target = batch_reward + self.discount_factor * q_next.max(1)[0].view(self.batch_size, 1)
-        loss = self.loss_func(q_eval, q_target)
+        q_next = self.get_next_state_values(batch_next_state, batch_indices)
+        # there is no bootstrapping on the last transition of an episode
+        discounts = self.discount_factor if batch_discounts is None else batch_discounts
+        q_target = batch_reward + discounts * (1 - batch_done) * q_next
+        if batch_weights is None:
+            loss = self.loss_func(q_eval, q_target)
+        else:
+            loss = (batch_weights * (q_eval - q_target) ** 2).mean()
+        td_errors = (q_target - q_eval).detach()
 
-        return loss
+        return loss, td_errors
 
     def compute_weights(self):
         """
-        Updates target net, sample a batch of transitions and compute loss from it
+        Every train_every calls, makes gradient_steps_per_update gradient steps. Each of them updates the target net,
+        and computes the loss of a batch of transitions.
         :return: None
         """""
-        # every n learning cycle, the target network will be replaced with the eval network
-        self.update_target_net()
-        # we can start learning when the memory is full
-        if self.memory_counter > self.memory_size:
-            # getting batch data
-            batch_state, batch_action, batch_reward, batch_next_state = self.sample_memory()
-
-            # Compute and backpropagate loss
-            loss = self.compute_loss(batch_state, batch_action, batch_reward, batch_next_state)
-            self.eval_net.backpropagate(loss)
+        self.compute_weights_counter += 1
+        if (self.compute_weights_counter - 1) % self.train_every != 0:
+            return
+
+        # we can start learning when enough transitions were stored
+        is_learning = self.memory.counter >= self.learning_starts
+        if is_learning:
+            # getting the data of all the gradient steps at once
+            batches = self.get_batches()
+
+        for gradient_step in range(self.gradient_steps_per_update):
+            # every n learning cycle, the target network will be replaced with the eval network
+            self.update_target_net()
+            if is_learning:
+                indices, batch, weights = batches[gradient_step]
+
+                # Compute and backpropagate loss
+                if self.n_steps > 1:
+                    # the cached target values are the ones of the transitions bootstrapped from
+                    *batch, batch_discounts, bootstrap_indices = batch
+                    loss, td_errors = self.compute_loss(*batch, weights, bootstrap_indices.numpy(), batch_discounts)
+                else:
+                    loss, td_errors = self.compute_loss(*batch, weights, indices)
+                self.eval_net.backpropagate(loss)
+                with self.memory_lock:
+                    self.memory.update_priorities(indices, td_errors.numpy())
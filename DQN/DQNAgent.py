@@ -55,10 +55,9 @@ class DQNAgent:
 
     def start(self, state):
         # getting actions
-        action_values = self.function_approximator.get_action_value(state)
+        action_values = self.function_approximator.act(state)
         # choosing the action to take
-        numpy_action_values = action_values.clone().detach().numpy() # TODO : check if still relevant
-        current_action = self.choose_action(numpy_action_values)
+        current_action = self.choose_action(action_values)
 
         # saving the action and the tiles activated
         self.previous_action = current_action
@@ -69,13 +68,12 @@ class DQNAgent:
 
     def step(self, state, reward):
         # getting the action values from the function approximator
-        action_values = self.function_approximator.get_action_value(state)
+        action_values = self.function_approximator.act(state)
 
         # storing the transition in the function approximator memory for further use
-        self.function_approximator.store_transition(self.previous_state, self.previous_action, reward, state)
+        self.function_approximator.store_transition(self.previous_state, self.previous_action, reward, state, False)
         # choosing an action
-        numpy_action_values = action_values.clone().detach().numpy() # TODO : check if still relevant
-        current_action = self.choose_action(numpy_action_values)
+        current_action = self.choose_action(action_values)
 
         self.control()
 
@@ -85,5 +83,9 @@ class DQNAgent:
         return current_action
 
     def end(self, state, reward):
-        self.function_approximator.store_transition(self.previous_state, self.previous_action, reward, state)
+        self.function_approximator.store_transition(self.previous_state, self.previous_action, reward, state, True)
         self.control()
+
+    def close(self):
+        # releases the resources used for learning, such as the prefetcher thread
+        self.function_approximator.close()
@@ -0,0 +1,145 @@
+from DQN.ReplayBuffer import *
+import tempfile
+import json
+import os
+
+
+class DiskReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer stored in memory-mapped .npy files, for memories too large to be kept in RAM.
+    The last transitions are written in an in-RAM ring, which is flushed to the files in one sequential write when it
+    is full. Batches are gathered by sorted indices so that the reads are mostly sequential.
+    The files and the number of transitions flushed are kept in memory_path. Without it, every buffer gets a new
+    directory of its own. A directory which already holds files is only reused when resume_memory is set, by a buffer
+    of the same size, which then resumes from them (the transitions still in the ring when the process stops are lost,
+    unless the buffer is closed).
+    """
+    ARRAYS_NAMES = ("states", "actions", "rewards", "next_states", "dones")
+
+    def __init__(self, params={}):
+        self.memory_path = None
+        self.resume_memory = None
+        self.ring_size = None
+        self.ring = None  # dict of the in-RAM arrays holding the transitions not flushed yet
+        self.ring_start = 0  # counter of the first transition of the ring
+
+        super(DiskReplayBuffer, self).__init__(params)
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params={}):
+        super(DiskReplayBuffer, self).set_params_from_dict(params)
+        self.memory_path = params.get("memory_path", None)
+        if self.memory_path is None:
+            # several sessions can be built with the same parameters, so a shared default path would mix their memories
+            self.memory_path = tempfile.mkdtemp(prefix="replay_memory_", dir=".")
+        self.resume_memory = params.get("resume_memory", False)
+        self.ring_size = min(params.get("ring_size", 1024), self.memory_size)
+
+    def allocate_memory(self):
+        os.makedirs(self.memory_path, exist_ok=True)
+        metadata = self.load_metadata()
+        if len(os.listdir(self.memory_path)) > 0:
+            assert self.resume_memory and metadata is not None, \
+                "memory_path already holds files, which are only reused to resume a replay memory (resume_memory)"
+            assert metadata["memory_size"] == self.memory_size and metadata["state_dim"] == self.state_dim, \
+                "The replay memory in memory_path doesn't have the same memory_size and state_dim"
+        is_resumed = metadata is not None
+        mode = "r+" if is_resumed else "w+"
+        for name, shape, dtype in self.get_arrays_specs():
+            path = os.path.join(self.memory_path, name + ".npy")
+            if is_resumed:
+                array = np.lib.format.open_memmap(path, mode=mode)
+            else:
+                array = np.lib.format.open_memmap(path, mode=mode, dtype=dtype, shape=(self.memory_size,) + shape)
+            setattr(self, name, array)
+        # the ring has the same layout as the files
+        self.ring = {name: np.zeros((self.ring_size,) + shape, dtype=dtype) for name, shape, dtype in
+                     self.get_arrays_specs()}
+        self.counter = metadata["counter"] if is_resumed else 0
+        self.ring_start = self.counter
+        if not is_resumed:
+            self.save_metadata()
+
+    def set_tensors(self):
+        # the batches are gathered from the files and the ring, so there are no tensors sharing the whole memory
+        pass
+
+    def get_arrays_specs(self):
+        """ name, shape of one element and dtype of every array of the memory """
+        return [("states", (self.state_dim,), np.float32),
+                ("actions", (), np.int64),
+                ("rewards", (), np.float32),
+                ("next_states", (self.state_dim,), np.float32),
+                ("dones", (), np.float32)]
+
+    def load_metadata(self):
+        path = os.path.join(self.memory_path, "metadata.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as json_file:
+            return json.load(json_file)
+
+    def save_metadata(self):
+        metadata = {"memory_size": self.memory_size, "state_dim": self.state_dim, "counter": self.ring_start}
+        with open(os.path.join(self.memory_path, "metadata.json"), 'w') as json_file:
+            json.dump(metadata, json_file)
+
+    # ====== Memory functions =======================================================
+
+    def store_transition(self, state, action, reward, next_state, done=False):
+        ring_index = self.counter - self.ring_start
+        transition = (state, action, reward, next_state, done)
+        for name, value in zip(self.ARRAYS_NAMES, transition):
+            self.ring[name][ring_index] = value
+        index = self.counter % self.memory_size
+        self.counter += 1
+        if self.counter - self.ring_start == self.ring_size:
+            self.flush()
+        return index
+
+    def flush(self):
+        """ Writes the transitions of the ring to the files """
+        num_transitions = self.counter - self.ring_start
+        if num_transitions == 0:
+            return
+        start = self.ring_start % self.memory_size
+        # the ring is written in at most two contiguous blocks, depending on whether it wraps around the memory end
+        first_block = min(num_transitions, self.memory_size - start)
+        for name in self.ARRAYS_NAMES:
+            array, ring = getattr(self, name), self.ring[name]
+            array[start:start + first_block] = ring[:first_block]
+            array[:num_transitions - first_block] = ring[first_block:num_transitions]
+            array.flush()
+        self.ring_start = self.counter
+        self.save_metadata()
+
+    def close(self):
+        """ Flushes the ring to the files, then releases the memory maps and the ring """
+        self.flush()
+        for name in self.ARRAYS_NAMES:
+            setattr(self, name, None)
+        self.ring = None
+
+    def get_batch(self, indices):
+        indices = np.asarray(indices, dtype=np.int64)
+        # position in the ring of the transitions not flushed yet
+        ring_indices = (indices - self.ring_start) % self.memory_size
+        is_in_ring = ring_indices < self.counter - self.ring_start
+
+        # the transitions on disk are read in increasing order
+        disk_positions = np.flatnonzero(~is_in_ring)
+        disk_positions = disk_positions[np.argsort(indices[disk_positions], kind="stable")]
+        ring_positions = np.flatnonzero(is_in_ring)
+
+        batch = []
+        for name in self.ARRAYS_NAMES:
+            array, ring = getattr(self, name), self.ring[name]
+            values = np.empty((indices.shape[0],) + array.shape[1:], dtype=array.dtype)
+            values[disk_positions] = array[indices[disk_positions]]
+            values[ring_positions] = ring[ring_indices[ring_positions]]
+            batch.append(torch.from_numpy(values))
+
+        batch_state, batch_action, batch_reward, batch_next_state, batch_done = batch
+        return batch_state, batch_action.unsqueeze(1), batch_reward.unsqueeze(1), batch_next_state, \
+            batch_done.unsqueeze(1)
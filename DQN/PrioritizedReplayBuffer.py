@@ -0,0 +1,69 @@
+from DQN.ReplayBuffer import *
+from DQN.SumTree import *
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer sampling transitions with probabilities proportional to priority ** alpha, the priority of a
+    transition being its last absolute TD error (Schaul et al., Prioritized Experience Replay). The bias introduced is
+    corrected with importance sampling weights, whose exponent beta is annealed towards 1.
+    """
+    def __init__(self, params={}):
+        self.alpha = None
+        self.beta = None
+        self.beta_increment = None
+        self.priority_epsilon = None
+        self.max_priority = 1.0  # priority given to new transitions, so that they are sampled at least once
+        self.sum_tree = None
+
+        super(PrioritizedReplayBuffer, self).__init__(params)
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params={}):
+        super(PrioritizedReplayBuffer, self).set_params_from_dict(params)
+        self.alpha = params.get("alpha", 0.6)
+        self.beta = params.get("beta", 0.4)
+        self.beta_increment = params.get("beta_increment", 0.001)  # added to beta at every sampling
+        self.priority_epsilon = params.get("priority_epsilon", 1e-6)  # keeps every priority strictly positive
+
+    def set_other_params(self):
+        super(PrioritizedReplayBuffer, self).set_other_params()
+        self.sum_tree = SumTree(self.memory_size)
+
+    # ====== Memory functions =======================================================
+
+    def store_transition(self, state, action, reward, next_state, done=False):
+        index = super(PrioritizedReplayBuffer, self).store_transition(state, action, reward, next_state, done)
+        self.sum_tree.update_single(index, self.max_priority ** self.alpha)
+        return index
+
+    def sample_indices(self, batch_size):
+        return np.minimum(self.sum_tree.sample(batch_size), len(self) - 1)
+
+    def compute_weights(self, indices):
+        """
+        Importance sampling weights of the sampled transitions, normalized by the largest one of the batch
+        :return: tensor of shape [batch_size, 1]
+        """
+        probabilities = self.sum_tree.get(indices) / self.sum_tree.total()
+        weights = (len(self) * probabilities) ** (- self.beta)
+        weights /= weights.max()
+        return torch.from_numpy(weights.astype(np.float32)).unsqueeze(1)
+
+    def sample(self, batch_size):
+        indices = self.sample_indices(batch_size)
+        weights = self.compute_weights(indices)
+        self.beta = min(1.0, self.beta + self.beta_increment)
+        return indices, self.get_batch(indices), weights
+
+    def update_priorities(self, indices, td_errors):
+        """
+        Sets the priorities of the sampled transitions to their new absolute TD errors
+        :param indices: int array of shape [batch_size]
+        :param td_errors: array of shape [batch_size]
+        """
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64).reshape(-1)) + self.priority_epsilon
+        self.max_priority = max(self.max_priority, priorities.max())
+        # a transition sampled several times keeps the last of its TD errors
+        self.sum_tree.update(indices, priorities ** self.alpha)
@@ -0,0 +1,171 @@
+import numpy as np
+import torch
+
+
+class ReplayBuffer:
+    """
+    Circular memory of transitions (S, A, R, S', done) for DQN.
+    Each element of the transitions is stored in its own preallocated and typed numpy array, and torch tensors sharing
+    the memory of those arrays are created once, so that a batch is gathered with a single index_select per array
+    without any intermediate copy.
+    """
+    def __init__(self, params={}):
+        self.memory_size = None
+        self.state_dim = None
+        self.counter = 0  # total number of transitions stored since the creation of the memory
+
+        self.states = None
+        self.actions = None
+        self.rewards = None
+        self.next_states = None
+        self.dones = None
+
+        # torch views of the arrays
+        self.states_tensor = None
+        self.actions_tensor = None
+        self.rewards_tensor = None
+        self.next_states_tensor = None
+        self.dones_tensor = None
+
+        self.set_params_from_dict(params)
+        self.set_other_params()
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params={}):
+        self.memory_size = params.get("memory_size", 200)
+        self.state_dim = params.get("state_dim", 4)
+
+    def set_other_params(self):
+        self.allocate_memory()
+        self.set_tensors()
+
+    def allocate_memory(self):
+        self.states = np.zeros((self.memory_size, self.state_dim), dtype=np.float32)
+        self.actions = np.zeros(self.memory_size, dtype=np.int64)
+        self.rewards = np.zeros(self.memory_size, dtype=np.float32)
+        self.next_states = np.zeros((self.memory_size, self.state_dim), dtype=np.float32)
+        self.dones = np.zeros(self.memory_size, dtype=np.float32)
+
+    def set_tensors(self):
+        self.states_tensor = torch.from_numpy(self.states)
+        self.actions_tensor = torch.from_numpy(self.actions)
+        self.rewards_tensor = torch.from_numpy(self.rewards)
+        self.next_states_tensor = torch.from_numpy(self.next_states)
+        self.dones_tensor = torch.from_numpy(self.dones)
+
+    def __len__(self):
+        """ number of transitions that can be sampled """
+        return min(self.counter, self.memory_size)
+
+    # ====== Memory functions =======================================================
+
+    def store_transition(self, state, action, reward, next_state, done=False):
+        """
+        Stores a transition, overwriting the oldest one if the memory is full.
+        :return: the index at which the transition was stored
+        """
+        index = self.counter % self.memory_size
+        self.states[index] = state
+        self.actions[index] = action
+        self.rewards[index] = reward
+        self.next_states[index] = next_state
+        self.dones[index] = done
+        self.counter += 1
+        return index
+
+    def sample_indices(self, batch_size):
+        # only the part of the memory that was already filled is sampled
+        return np.random.randint(len(self), size=batch_size)
+
+    def get_batch(self, indices):
+        """
+        Gathers the transitions at the given indices
+        :param indices: int array of shape [batch_size]
+        :return: batch_state [batch_size, state_dim], batch_action [batch_size, 1], batch_reward [batch_size, 1],
+        batch_next_state [batch_size, state_dim] and batch_done [batch_size, 1] tensors
+        """
+        torch_indices = torch.from_numpy(np.asarray(indices, dtype=np.int64))
+        batch_state = self.states_tensor.index_select(0, torch_indices)
+        batch_action = self.actions_tensor.index_select(0, torch_indices).unsqueeze(1)
+        batch_reward = self.rewards_tensor.index_select(0, torch_indices).unsqueeze(1)
+        batch_next_state = self.next_states_tensor.index_select(0, torch_indices)
+        batch_done = self.dones_tensor.index_select(0, torch_indices).unsqueeze(1)
+        return batch_state, batch_action, batch_reward, batch_next_state, batch_done
+
+    def sample(self, batch_size):
+        """
+        :return: the indices of the transitions sampled, the batch of transitions and their importance sampling
+        weights (None, since the sampling is uniform)
+        """
+        indices = self.sample_indices(batch_size)
+        return indices, self.get_batch(indices), None
+
+    def get_next_indices(self, indices):
+        """
+        Indices of the transitions following the given ones in their episodes
+        :param indices: int array of shape [n]
+        :return: the indices of the next transitions, and a boolean array of shape [n] which is False where there is no
+        next transition stored yet
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        # the transitions are stored one after the other, and nothing follows the last one stored
+        return (indices + 1) % self.memory_size, indices != (self.counter - 1) % self.memory_size
+
+    def get_n_step_batch(self, indices, batch, n_steps, discount_factor):
+        """
+        Turns a batch of transitions into n-step transitions: the reward becomes the discounted sum of the rewards of
+        the transition and of the n_steps - 1 following ones, and the next state the one reached after them. The
+        transitions must be stored in the order of their episodes, with done = 1 for the last one of each episode:
+        the n-step transitions are then truncated at the end of their episode and at the last transition stored.
+        All the following transitions are gathered at once, so there is no loop over the batch.
+        :param indices: int array of shape [batch_size], indices of the first transitions
+        :param batch: tensors of these transitions, as returned by get_batch
+        :param n_steps: maximum number of transitions of the n-step transitions
+        :param discount_factor: discount factor of the rewards
+        :return: batch_state, batch_action, batch_return [batch_size, 1], batch_next_state, batch_done, batch_discount
+        [batch_size, 1] by which the value of the next state is discounted, and the indices [batch_size] of the
+        transitions whose next states are bootstrapped from
+        """
+        batch_state, batch_action, batch_reward, batch_next_state, batch_done = batch
+        batch_size = batch_state.shape[0]
+
+        # indices of the following transitions, of shape [batch_size, n_steps - 1]
+        next_indices = np.empty((batch_size, n_steps - 1), dtype=np.int64)
+        has_next = np.empty((batch_size, n_steps - 1), dtype=bool)
+        previous_indices = np.asarray(indices, dtype=np.int64)
+        for step in range(n_steps - 1):
+            next_indices[:, step], has_next[:, step] = self.get_next_indices(previous_indices)
+            previous_indices = next_indices[:, step]
+        next_batch = self.get_batch(next_indices.reshape(-1))
+
+        # values of the n steps, of shape [batch_size, n_steps]
+        rewards = np.concatenate((batch_reward.numpy(), next_batch[2].numpy().reshape(batch_size, -1)), axis=1)
+        dones = np.concatenate((batch_done.numpy(), next_batch[4].numpy().reshape(batch_size, -1)), axis=1)
+        next_states = torch.cat((batch_next_state.unsqueeze(1), next_batch[3].view(batch_size, n_steps - 1, -1)), 1)
+        steps_indices = np.concatenate((np.asarray(indices, dtype=np.int64).reshape(-1, 1), next_indices), axis=1)
+
+        # a step is used if the next transitions were stored and none of the previous steps ended the episode
+        is_used = np.ones((batch_size, n_steps), dtype=bool)
+        is_used[:, 1:] = np.logical_and.accumulate(has_next & (dones[:, :-1] == 0), axis=1)
+        num_steps = is_used.sum(axis=1)
+        last_steps = num_steps - 1
+
+        discounts = discount_factor ** np.arange(n_steps, dtype=np.float32)
+        batch_return = (rewards * discounts * is_used).sum(axis=1, keepdims=True).astype(np.float32)
+        batch_discount = (discount_factor ** num_steps).astype(np.float32).reshape(-1, 1)
+        rows = np.arange(batch_size)
+        bootstrap_indices = steps_indices[rows, last_steps]
+        batch_next_state = next_states[torch.from_numpy(rows), torch.from_numpy(last_steps)]
+        batch_done = dones[rows, last_steps].reshape(-1, 1)
+
+        return batch_state, batch_action, torch.from_numpy(batch_return), batch_next_state, \
+            torch.from_numpy(batch_done), torch.from_numpy(batch_discount), torch.from_numpy(bootstrap_indices)
+
+    def update_priorities(self, indices, td_errors):
+        # uniform sampling doesn't use priorities
+        pass
+
+    def close(self):
+        # the arrays are released with the memory
+        pass
@@ -0,0 +1,87 @@
+from DQN.ReplayBuffer import *
+from multiprocessing import shared_memory
+import multiprocessing
+
+
+class SharedReplayBuffer(ReplayBuffer):
+    """
+    Replay buffer whose arrays and counter are stored in multiprocessing.shared_memory blocks, so that several
+    processes can write transitions in it while another one samples them.
+    The process creating the memory owns the blocks, and the other ones attach to them with the names returned by
+    get_handles and the lock of the memory. Storing a transition and sampling a batch are done while holding the lock.
+    """
+    ARRAYS_NAMES = ("states", "actions", "rewards", "next_states", "dones")
+
+    def __init__(self, params={}, handles=None, lock=None):
+        self.handles = handles  # names of the shared memory blocks to attach to, None to create them
+        self.is_owner = handles is None
+        self.lock = lock
+        self.blocks = {}
+        self.shared_counter = None
+
+        super(SharedReplayBuffer, self).__init__(params)
+
+    # the counter is shared by all the processes using the memory
+    @property
+    def counter(self):
+        if self.shared_counter is None:
+            return 0
+        return int(self.shared_counter[0])
+
+    @counter.setter
+    def counter(self, value):
+        if self.shared_counter is not None:
+            self.shared_counter[0] = value
+
+    # ====== Initialization functions =======================================================
+
+    def get_arrays_specs(self):
+        """ name, shape and dtype of every shared array """
+        return [("states", (self.memory_size, self.state_dim), np.float32),
+                ("actions", (self.memory_size,), np.int64),
+                ("rewards", (self.memory_size,), np.float32),
+                ("next_states", (self.memory_size, self.state_dim), np.float32),
+                ("dones", (self.memory_size,), np.float32),
+                ("shared_counter", (1,), np.int64)]
+
+    def allocate_memory(self):
+        if self.lock is None:
+            self.lock = multiprocessing.Lock()
+        for name, shape, dtype in self.get_arrays_specs():
+            if self.is_owner:
+                size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+                block = shared_memory.SharedMemory(create=True, size=size)
+            else:
+                block = shared_memory.SharedMemory(name=self.handles[name])
+            self.blocks[name] = block
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            if self.is_owner:
+                array.fill(0)
+            setattr(self, name, array)
+
+    def get_handles(self):
+        """ names of the shared memory blocks, to give to the processes attaching to the memory """
+        return {name: block.name for name, block in self.blocks.items()}
+
+    def close(self):
+        """ Detaches the process from the memory, and frees the memory if the process created it """
+        # the views on the blocks must be released before closing them
+        for name in self.blocks:
+            setattr(self, name, None)
+        self.states_tensor = self.actions_tensor = self.rewards_tensor = None
+        self.next_states_tensor = self.dones_tensor = None
+        for block in self.blocks.values():
+            block.close()
+            if self.is_owner:
+                block.unlink()
+        self.blocks = {}
+
+    # ====== Memory functions =======================================================
+
+    def store_transition(self, state, action, reward, next_state, done=False):
+        with self.lock:
+            return super(SharedReplayBuffer, self).store_transition(state, action, reward, next_state, done)
+
+    def sample(self, batch_size):
+        with self.lock:
+            return super(SharedReplayBuffer, self).sample(batch_size)
@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class SumTree:
+    """
+    Binary tree stored in an array, where every node holds the sum of the priorities of its children. The leaves are
+    the priorities of the elements. Updating priorities and sampling an element proportionally to its priority are
+    O(log n), and both are done for whole batches at once, one tree level at a time. A single priority, like the one
+    of a new transition, is updated with a python loop instead, which avoids the cost of the numpy calls.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # number of leaves, rounded up to a power of 2 so that every level of the tree is full
+        self.num_leaves = 1 << int(max(capacity - 1, 1)).bit_length()
+        self.depth = self.num_leaves.bit_length() - 1
+        # node i has children 2i and 2i+1, the root is node 1 and the leaves start at num_leaves
+        self.tree = np.zeros(2 * self.num_leaves, dtype=np.float64)
+        # memoryview of the tree, whose items are read and written as python floats much faster than with numpy
+        self.tree_view = memoryview(self.tree)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[self.num_leaves + np.asarray(indices)]
+
+    def update(self, indices, priorities):
+        """
+        Sets the priorities of elements and updates the sums of their ancestors
+        :param indices: int array of shape [n], indices of the elements
+        :param priorities: array of shape [n]
+        """
+        nodes = self.num_leaves + np.asarray(indices, dtype=np.int64)
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def update_single(self, index, priority):
+        """
+        Sets the priority of one element and adds its change to the sums of its ancestors
+        """
+        tree = self.tree_view
+        node = self.num_leaves + index
+        delta = priority - tree[node]
+        while node >= 1:
+            tree[node] += delta
+            node //= 2
+
+    def find(self, values):
+        """
+        Finds the elements in which the values fall when the priorities are laid out one after the other
+        :param values: array of shape [n] of values between 0 and the total of the priorities
+        :return: int array of shape [n] containing the indices of the elements
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(values.shape[0], dtype=np.int64)
+        for _ in range(self.depth):
+            left_children = 2 * nodes
+            left_sums = self.tree[left_children]
+            go_right = values >= left_sums
+            values -= left_sums * go_right
+            nodes = left_children + go_right
+        # rounding errors can lead to leaves beyond the last element
+        return np.minimum(nodes - self.num_leaves, self.capacity - 1)
+
+    def sample(self, batch_size):
+        """
+        Samples elements with probabilities proportional to their priorities, one in each of batch_size segments of
+        equal mass to reduce the variance of the batch
+        """
+        segment = self.total() / batch_size
+        values = (np.arange(batch_size) + np.random.uniform(size=batch_size)) * segment
+        return self.find(values)
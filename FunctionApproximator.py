@@ -1,4 +1,18 @@
 from TileCoder.TileCoderSutton import *
+from TileCoder.DenseTileCoder import *
+from SparseTraces import *
+from collections import deque
+import json
+import os
+
+# types of function approximator relying on a tile coder and a (num_actions, iht_size) matrix of weights
+TILE_CODER_TYPES = ("tile coder", "dense tile coder")
+# storage dtype of the weights and dtype in which they are accumulated, for each dtype option
+WEIGHTS_DTYPES = {
+    "float64": (np.float64, np.float64),
+    "float32": (np.float32, np.float32),
+    "float16": (np.float16, np.float32)
+}
 
 
 class FunctionApproximator:
@@ -13,6 +27,16 @@ class FunctionApproximator:
         self.num_tilings = None
         self.tile_coder = None
         self.num_actions = None
+        self.dtype = None
+        self.weights_dtype = None
+        self.compute_dtype = None  # dtype in which weights are summed, also used for the traces
+        self.index_dtype = None
+
+        # cache of the tiles activated by the last states seen, so that a state is only tile coded once per transition
+        self.tiles_cache = None
+        self.tiles_cache_size = None
+        self.tiles_cache_hits = 0
+        self.tiles_cache_misses = 0
 
         self.eligibility_traces = None
         self.trace_decay = None
@@ -30,29 +54,121 @@ class FunctionApproximator:
         self.num_tiles = params.get("num_tiles", 8)
         self.num_tilings = params.get("num_tilings", 8)
         self.num_actions = params.get("num_actions", 3)
-        self.weights = np.ones((self.num_actions, self.iht_size)) * self.initial_weights
+        self.dtype = params.get("dtype", "float64")  # can also be "float32" or "float16"
+        self.weights_dtype, self.compute_dtype = WEIGHTS_DTYPES[self.dtype]
+        # compact storages also use 32 bits integers for the tiles indices
+        self.index_dtype = np.int64 if self.dtype == "float64" else np.int32
+        self.tiles_cache_size = params.get("tiles_cache_size", 2)
+        self.tiles_cache = deque(maxlen=self.tiles_cache_size)
+
+        if self.type == "dense tile coder":
+            self.tile_coder = DenseTileCoder({
+                'num_tilings': self.num_tilings,
+                'num_tiles': self.num_tiles,
+                'min_values': params.get("env_min_values", 0.0),
+                'max_values': params.get("env_max_values", 0.0)
+            })
+            # there is one weight per tile of the grid, whatever the iht_size given
+            self.iht_size = self.tile_coder.size
+        else:
+            self.tile_coder = TileCoderSutton({
+                'max_size': self.iht_size,
+                'num_tilings': self.num_tilings,
+                'num_tiles': self.num_tiles,
+                'min_values': params.get("env_min_values", 0.0),
+                'max_values': params.get("env_max_values", 0.0),
+                'iht_type': params.get("iht_type", "dictionary"),
+                'index_dtype': self.index_dtype
+            })
 
-        self.tile_coder = TileCoderSutton({
-            'max_size': self.iht_size,
-            'num_tilings': self.num_tilings,
-            'num_tiles': self.num_tiles,
-            'min_values': params.get("env_min_values", 0.0),
-            'max_values': params.get("env_max_values", 0.0)
-        })
+        self.weights = np.full((self.num_actions, self.iht_size), self.initial_weights, dtype=self.weights_dtype)
+
+        # warm start from a previous checkpoint
+        if params.get("checkpoint_path") is not None:
+            self.load_checkpoint(params["checkpoint_path"], params.get("checkpoint_mmap_mode"))
 
     def initialize_function_approximator(self, params={}):
-        if self.type == "tile coder":
+        if self.type in TILE_CODER_TYPES:
             self.initialize_tile_coder(params)
 
     def get_action_value(self, state, action=None):
         action_value = None
-        if self.type == "tile coder":
-            action_value = np.sum(self.get_weights(state, action), axis=-1)
+        if self.type in TILE_CODER_TYPES:
+            action_value = np.sum(self.get_weights(state, action), axis=-1, dtype=self.compute_dtype)
 
         return action_value
 
+    def get_action_values_batch(self, states, readonly=False):
+        """
+        Computes the values of all the actions for a batch of states with a single gather over the weights.
+        :param states: array of shape (N, state_dim)
+        :param readonly: if True, the tile coder isn't modified: the tiles never seen before count as initial weights
+        :return: array of shape (N, num_actions) containing the action values
+        """
+        action_values = None
+        if self.type in TILE_CODER_TYPES:
+            tiles = self.tile_coder.get_activated_tiles_batch(states, readonly=readonly)
+            weights = self.weights[:, tiles]
+            if readonly:
+                weights = np.where(tiles < 0, self.initial_weights, weights)
+            action_values = np.sum(weights, axis=-1, dtype=self.compute_dtype).T
+
+        return action_values
+
+    def get_value_and_policy_grids(self, num_points=50, min_values=None, max_values=None, chunk_size=4096):
+        """
+        Evaluates the greedy state value and the greedy policy on a regular grid covering the state space. The grid is
+        processed in chunks of chunk_size states so that the memory used doesn't grow with the size of the grid. The
+        tile coder isn't modified.
+        :param num_points: number of points of the grid along each dimension (int or list with one int per dimension)
+        :param min_values: lower bounds of the grid, defaults to the env_min_values of the tile coder
+        :param max_values: upper bounds of the grid, defaults to the env_max_values of the tile coder
+        :param chunk_size: number of states evaluated at once
+        :return: the list of the grid coordinates along each dimension, and two arrays of shape num_points containing
+        the max action value and the greedy action at each point of the grid
+        """
+        min_values = self.tile_coder.min_values if min_values is None else np.asarray(min_values, dtype=float)
+        max_values = self.tile_coder.max_values if max_values is None else np.asarray(max_values, dtype=float)
+        grid_shape = tuple(np.broadcast_to(num_points, min_values.shape))
+        axes = [np.linspace(low, high, n) for low, high, n in zip(min_values, max_values, grid_shape)]
+
+        num_states = int(np.prod(grid_shape))
+        values = np.empty(num_states)
+        policy = np.empty(num_states, dtype=int)
+        for start in range(0, num_states, chunk_size):
+            flat_indices = np.arange(start, min(start + chunk_size, num_states))
+            grid_indices = np.unravel_index(flat_indices, grid_shape)
+            states = np.stack([axis[indices] for axis, indices in zip(axes, grid_indices)], axis=-1)
+            action_values = self.get_action_values_batch(states, readonly=True)
+            values[flat_indices] = np.max(action_values, axis=-1)
+            policy[flat_indices] = np.argmax(action_values, axis=-1)
+
+        return axes, values.reshape(grid_shape), policy.reshape(grid_shape)
+
+    def get_tiles(self, state):
+        """
+        Returns the tiles activated by the state. The tiles of the last tiles_cache_size states are memoized, the key
+        being the identity of the state object: a state must therefore not be modified in place once it was given to
+        the function approximator.
+        :param state: state whose activated tiles are wanted
+        :return: array containing the indices of the activated tiles
+        """
+        for cached_state, cached_tiles in self.tiles_cache:
+            if cached_state is state:
+                self.tiles_cache_hits += 1
+                return cached_tiles
+        self.tiles_cache_misses += 1
+        tiles = self.tile_coder.get_activated_tiles(state).astype(self.index_dtype, copy=False)
+        if self.tiles_cache_size > 0:
+            # the state itself is kept in the cache so that its id can't be reused by another object
+            self.tiles_cache.append((state, tiles))
+        return tiles
+
+    def clear_tiles_cache(self):
+        self.tiles_cache.clear()
+
     def get_weights(self, state, action=None):
-        tiles = self.tile_coder.get_activated_tiles(state)
+        tiles = self.get_tiles(state)
         if action is not None:
             weights = self.weights[action, tiles]
         else:
@@ -60,7 +176,7 @@ class FunctionApproximator:
         return weights
 
     def get_one_hot_state(self, state, action=None):
-        tiles = self.tile_coder.get_activated_tiles(state)
+        tiles = self.get_tiles(state)
         one_hot_state = np.zeros(self.iht_size)
         one_hot_state[tiles] = 1
         return one_hot_state
@@ -68,27 +184,95 @@ class FunctionApproximator:
     # == Weights computing functions ==================================================================================
 
     def compute_weights(self, learning_rate, delta, state, action):
-        if self.type == "tile coder":
+        if self.type in TILE_CODER_TYPES:
             grad = np.ones(self.num_tilings)
-            tiles = self.tile_coder.get_activated_tiles(state)
+            tiles = self.get_tiles(state)
             self.weights[action, tiles] += (learning_rate / self.num_tilings) * delta * grad
 
     def compute_weights_with_eligibility_traces(self, learning_rate, delta, eligibility_traces):
-        if self.type == "tile coder":
-            self.weights += (learning_rate / self.num_tilings) * delta * eligibility_traces
+        if self.type in TILE_CODER_TYPES:
+            self.add_traces_to_weights((learning_rate / self.num_tilings) * delta, eligibility_traces)
         else:
             print(f'eligibility traces not yet implemented for {self.type}')
 
     def compute_weights_with_dutch_traces(self, learning_rate, delta, state, action, eligibility_traces, action_value,
                                           old_action_value):
-        if self.type == "tile coder":
-            self.weights += (learning_rate / self.num_tilings) * (delta + action_value - old_action_value) * eligibility_traces
-            tiles = self.tile_coder.get_activated_tiles(state)
+        if self.type in TILE_CODER_TYPES:
+            self.add_traces_to_weights((learning_rate / self.num_tilings) * (delta + action_value - old_action_value),
+                                       eligibility_traces)
+            tiles = self.get_tiles(state)
             self.weights[action, tiles] -= (learning_rate / self.num_tilings) * (action_value - old_action_value)
         else:
             print(f'dutch traces not yet implemented for {self.type}')
 
+    def add_traces_to_weights(self, scale, eligibility_traces):
+        # sparse traces only touch the weights of their active entries
+        # the traces are stored in compute_dtype, so the additions are never done in float16
+        if isinstance(eligibility_traces, SparseTraces):
+            eligibility_traces.add_scaled_to(self.weights, scale)
+        else:
+            self.weights += scale * eligibility_traces
+
     def compute_weights_with_reinforce(self, learning_rate, discount_factor, G, pw, state, action):
+        if self.type in TILE_CODER_TYPES:
+            tiles = self.get_tiles(state)
+            self.weights[:, tiles] = learning_rate * discount_factor ** pw * G
+
+    # == Checkpoint functions =========================================================================================
+
+    def save_checkpoint(self, directory):
+        """
+        Saves the weights and the IHT of the tile coder in a directory. Every array is stored in its own .npy file so
+        that it can be memory-mapped when the checkpoint is loaded.
+        :param directory: path of the directory of the checkpoint, created if it doesn't exist
+        """
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "weights.npy"), self.weights)
+        metadata = {
+            "type": self.type,
+            "iht_size": self.iht_size,
+            "num_tilings": self.num_tilings,
+            "num_actions": self.num_actions
+        }
+        if self.type == "tile coder":
+            iht = self.tile_coder.iht
+            for name, array in zip(iht.ARRAYS_NAMES, iht.get_arrays()):
+                np.save(os.path.join(directory, "iht_" + name + ".npy"), array)
+            metadata["iht_type"] = self.tile_coder.iht_type
+            metadata["iht_count"] = iht.count()
+            metadata["iht_overfull_count"] = iht.overfullCount
+        with open(os.path.join(directory, "metadata.json"), 'w') as json_file:
+            json.dump(metadata, json_file)
+
+    def load_checkpoint(self, directory, mmap_mode=None):
+        """
+        Loads the weights and the IHT saved by save_checkpoint. The checkpoint must come from a function approximator
+        with the same parameters.
+        :param directory: path of the directory of the checkpoint
+        :param mmap_mode: mmap_mode given to np.load. With "r", the arrays aren't copied into memory and can be shared
+        by several processes, but they can't be modified (no learning, and no new tiles can be added to an array IHT).
+        With "c", the arrays are copied on write only.
+        """
+        with open(os.path.join(directory, "metadata.json")) as json_file:
+            metadata = json.load(json_file)
+        assert metadata["type"] == self.type and metadata["iht_size"] == self.iht_size and \
+            metadata["num_tilings"] == self.num_tilings and metadata["num_actions"] == self.num_actions, \
+            "The checkpoint doesn't match the parameters of the function approximator"
+
+        weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode=mmap_mode)
+        assert weights.dtype == self.weights_dtype, \
+            "The checkpoint weights don't have the dtype of the function approximator"
+        self.weights = weights
         if self.type == "tile coder":
-            tiles = self.tile_coder.get_activated_tiles(state)
-            self.weights[:, tiles] = learning_rate * discount_factor ** pw * G
\ No newline at end of file
+            assert metadata["iht_type"] == self.tile_coder.iht_type, "The checkpoint IHT is not of the same type"
+            iht = self.tile_coder.iht
+            # the dictionary IHT has to be rebuilt anyway, so its arrays are read directly
+            iht_mmap_mode = mmap_mode if self.tile_coder.iht_type == "array" else None
+            arrays = [np.load(os.path.join(directory, "iht_" + name + ".npy"), mmap_mode=iht_mmap_mode)
+                      for name in iht.ARRAYS_NAMES]
+            if self.tile_coder.iht_type == "array":
+                iht.set_arrays(*arrays, metadata["iht_count"])
+            else:
+                iht.set_arrays(*arrays)
+            iht.overfullCount = metadata["iht_overfull_count"]
+        self.clear_tiles_cache()
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+class EpisodeBuffer:
+    """
+    Steps of the current episode (states, actions, log probabilities of the actions and rewards), stored in typed
+    arrays whose capacity is doubled when they are full, so that adding a step costs O(1) amortized instead of copying
+    the whole episode. The arrays are kept from one episode to the next, and the learner gets views of their filled
+    part, without copy. The views are only valid until the next step is added.
+    The arrays are allocated at the first step, with the shapes of its state and action and the dtype of its action.
+    """
+    ARRAYS_NAMES = ("states", "actions", "log_probs", "rewards")
+
+    def __init__(self, initial_capacity=256, state_dtype=np.float32):
+        self.capacity = initial_capacity
+        self.state_dtype = state_dtype
+
+        self.states = None
+        self.actions = None
+        self.log_probs = None
+        self.rewards = None
+
+        self.num_steps = 0  # number of states and actions of the episode
+        self.num_rewards = 0
+
+    def reset(self):
+        # the arrays are reused by the next episode
+        self.num_steps = 0
+        self.num_rewards = 0
+
+    def allocate(self, state, action):
+        state, action = np.asarray(state), np.asarray(action)
+        self.states = np.zeros((self.capacity,) + state.shape, dtype=self.state_dtype)
+        self.actions = np.zeros((self.capacity,) + action.shape, dtype=action.dtype)
+        self.log_probs = np.zeros(self.capacity, dtype=np.float32)
+        self.rewards = np.zeros(self.capacity, dtype=np.float64)
+
+    def grow(self):
+        """ Doubles the capacity of the arrays, keeping their content """
+        self.capacity *= 2
+        for name in self.ARRAYS_NAMES:
+            array = getattr(self, name)
+            new_array = np.zeros((self.capacity,) + array.shape[1:], dtype=array.dtype)
+            new_array[:array.shape[0]] = array
+            setattr(self, name, new_array)
+
+    def add_step(self, state, action, log_prob=0.0):
+        if self.states is None:
+            self.allocate(state, action)
+        elif self.num_steps == self.capacity:
+            self.grow()
+        self.states[self.num_steps] = state
+        self.actions[self.num_steps] = action
+        self.log_probs[self.num_steps] = log_prob
+        self.num_steps += 1
+
+    def add_reward(self, reward):
+        if self.num_rewards == self.capacity:
+            self.grow()
+        self.rewards[self.num_rewards] = reward
+        self.num_rewards += 1
+
+    def get_states(self):
+        return self.states[:self.num_steps]
+
+    def get_actions(self):
+        return self.actions[:self.num_steps]
+
+    def get_log_probs(self):
+        return self.log_probs[:self.num_steps]
+
+    def get_rewards(self):
+        return self.rewards[:self.num_rewards]
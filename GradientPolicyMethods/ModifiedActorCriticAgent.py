@@ -1,4 +1,5 @@
 from GradientPolicyMethods.PolicyEstimator import *
+from CategoricalSampler import *
 from DQN.DQN import *
 from GradientPolicyMethods.BaselineNetwork import *
 from DQN.CustomNeuralNetwork import *
@@ -17,6 +18,7 @@ class ActorCriticAgent:
         self.actions = []
         self.rewards = []
         self.is_continuous = None
+        self.action_sampler = None
 
         self.set_params_from_dict(params)
         #self.set_other_params()
@@ -27,6 +29,7 @@ class ActorCriticAgent:
         self.discount_factor = params.get("discount_factor", 0.9)
         self.num_actions = params.get("num_actions", 1)
         self.is_continuous = params.get("is_continuous", False)
+        self.action_sampler = CategoricalSampler(params.get("seed", None), params.get("sampling_method", "inverse cdf"))
 
         self.initialize_policy_estimator(params.get("policy_estimator_info"))
         self.initialize_function_approximator(params.get("function_approximator_info"))
@@ -108,10 +111,10 @@ class ActorCriticAgent:
 
     def choose_action(self, state):
         if self.is_continuous:
-            action_chosen = self.policy_estimator(state).detach().numpy()
+            action_chosen = self.policy_estimator.act(state)
         else:
-            action_probs = self.policy_estimator(state).detach().numpy()
-            action_chosen = np.random.choice(len(action_probs), p=action_probs)
+            action_probs = self.policy_estimator.act(state)
+            action_chosen = self.action_sampler.sample(action_probs)
         return action_chosen
 
     # ====== Agent core functions =======================================================
@@ -1,6 +1,7 @@
 import torch
 import torch.nn as nn
 import torch.optim as optim
+from InferenceRunner import *
 
 
 class PolicyEstimator():
@@ -19,9 +20,15 @@ class PolicyEstimator():
             nn.Softmax(dim=-1))
 
         self.optimizer = optim.Adam(self.network.parameters(), lr=self.α)
+        self.inference_runner = InferenceRunner(self.network)
 
     def predict(self, state):
         """ gives the probability of actions under current policy
         """
         action_probs = self.network(torch.FloatTensor(state))
         return action_probs
+
+    def act(self, state):
+        """ gives the probability of actions under current policy, as a numpy array, without autograd
+        """
+        return self.inference_runner.act(state)
@@ -1,5 +1,8 @@
 from FunctionApproximator import *
 from GradientPolicyMethods.PolicyEstimator import *
+from CategoricalSampler import *
+from utils import *
+from GradientPolicyMethods.EpisodeBuffer import *
 import torch
 
 
@@ -11,10 +14,12 @@ class REINFORCEAgent:
 
         self.policy_estimator = None
 
-        self.states = []
-        self.actions = []
-        self.rewards = []
+        self.episode_buffer = None
+        self.action_log_prob = None  # log probability of the last action chosen
         self.is_continuous = None
+        self.action_sampler = None
+        self.update_mode = None  # "step": one update per step of the episode, "batch": updates over the whole episode
+        self.num_gradient_steps = None  # number of updates per episode in batch mode
 
         self.set_params_from_dict(params)
 
@@ -24,6 +29,11 @@ class REINFORCEAgent:
         self.discount_factor = params.get("discount_factor", 0.9)
         self.num_actions = params.get("num_actions", 1)
         self.is_continuous = params.get("is_continuous", False)
+        self.action_sampler = CategoricalSampler(params.get("seed", None), params.get("sampling_method", "inverse cdf"))
+
+        self.update_mode = params.get("update_mode", "step")
+        self.num_gradient_steps = params.get("num_gradient_steps", 1)
+        self.episode_buffer = EpisodeBuffer(params.get("episode_buffer_capacity", 256))
 
         # self.function_approximation_method = params.get("function_approximation_method", "tile coding")
         params["policy_estimator_info"]["output_size"] = self.num_actions
@@ -36,42 +46,47 @@ class REINFORCEAgent:
 
     def choose_action(self, state):
         if self.is_continuous:
-            action_chosen = self.policy_estimator.predict(state).detach().numpy()
+            action_chosen = self.policy_estimator.act(state)
+            self.action_log_prob = 0.0
         else:
-            action_probs = self.policy_estimator.predict(state).detach().numpy()
-            action_chosen = np.random.choice(len(action_probs), p=action_probs)
+            action_probs = self.policy_estimator.act(state)
+            action_chosen = self.action_sampler.sample(action_probs)
+            self.action_log_prob = np.log(action_probs[action_chosen])
         return action_chosen
 
     def start(self, state):
         # choosing the action to take
         current_action = self.choose_action(state)
-        self.states = np.array([state])
-        self.actions = np.array([current_action])
-        self.rewards = []
+        self.episode_buffer.reset()
+        self.episode_buffer.add_step(state, current_action, self.action_log_prob)
 
         return current_action
 
     def step(self, state, reward):
         # getting the action values from the function approximator
         current_action = self.choose_action(state)
-        self.rewards.append(reward)
-        self.states = np.vstack((self.states, state))
-        self.actions = np.append(self.actions, current_action)
+        self.episode_buffer.add_reward(reward)
+        self.episode_buffer.add_step(state, current_action, self.action_log_prob)
         #self.episode_memory.extend((reward, state, current_action))
 
         return current_action
 
     def end(self, state, reward):
-        self.rewards.append(reward)
+        self.episode_buffer.add_reward(reward)
         # self.states.extend(state)
         # self.episode_memory.extend((reward, state))
 
     def learn_from_experience(self):
         """ replays the episode backward and make gradient ascent over the policy
         """
+        if self.update_mode == "batch":
+            self.learn_from_episode_batch()
+            return
         #self.policy_estimator.optimizer.zero_grad()
         discounted_reward = 0
-        reversed_episode = zip(self.rewards[::-1], self.states[::-1], self.actions[::-1])
+        states, actions, rewards = self.episode_buffer.get_states(), self.episode_buffer.get_actions(), \
+            self.episode_buffer.get_rewards()
+        reversed_episode = zip(rewards[::-1], states[::-1], actions[::-1])
         for reward, state, action in reversed_episode:
             self.policy_estimator.optimizer.zero_grad()
             discounted_reward = reward + self.discount_factor * discounted_reward
@@ -80,7 +95,17 @@ class REINFORCEAgent:
             loss.backward()
             self.policy_estimator.optimizer.step()
 
-
-
-
-
+    def learn_from_episode_batch(self):
+        """ makes num_gradient_steps gradient ascent steps over the whole episode at once: the discounted returns are
+        computed in one vectorized pass, and the probabilities of the actions taken in one forward pass
+        """
+        states = self.episode_buffer.get_states()
+        rewards = self.episode_buffer.get_rewards()
+        returns = torch.from_numpy(compute_discounted_returns(rewards, self.discount_factor).astype(np.float32))
+        actions = torch.from_numpy(self.episode_buffer.get_actions().astype(np.int64, copy=False)).unsqueeze(1)
+        for _ in range(self.num_gradient_steps):
+            self.policy_estimator.optimizer.zero_grad()
+            actions_probs = self.policy_estimator.predict(states).gather(1, actions).squeeze(1)
+            loss = - (torch.log(actions_probs) * returns).sum()
+            loss.backward()
+            self.policy_estimator.optimizer.step()
@@ -1,5 +1,8 @@
 from FunctionApproximator import *
 from GradientPolicyMethods.PolicyEstimator import *
+from CategoricalSampler import *
+from utils import *
+from GradientPolicyMethods.EpisodeBuffer import *
 from DQN.DQN import *
 from GradientPolicyMethods.BaselineNetwork import *
 
@@ -13,10 +16,12 @@ class REINFORCEAgentWithBaseline:
         self.policy_estimator = None
         self.function_approximator = None
 
-        self.states = []
-        self.actions = []
-        self.rewards = []
+        self.episode_buffer = None
+        self.action_log_prob = None  # log probability of the last action chosen
         self.is_continuous = None
+        self.action_sampler = None
+        self.update_mode = None  # "step": one update per step of the episode, "batch": updates over the whole episode
+        self.num_gradient_steps = None  # number of updates per episode in batch mode
 
         self.set_params_from_dict(params)
         # self.set_other_params()
@@ -27,6 +32,10 @@ class REINFORCEAgentWithBaseline:
         self.discount_factor = params.get("discount_factor", 0.9)
         self.num_actions = params.get("num_actions", 1)
         self.is_continuous = params.get("is_continuous", False)
+        self.action_sampler = CategoricalSampler(params.get("seed", None), params.get("sampling_method", "inverse cdf"))
+        self.update_mode = params.get("update_mode", "step")
+        self.num_gradient_steps = params.get("num_gradient_steps", 1)
+        self.episode_buffer = EpisodeBuffer(params.get("episode_buffer_capacity", 256))
 
         params["policy_estimator_info"]["output_size"] = self.num_actions
         self.initialize_policy_estimator(params.get("policy_estimator_info"))
@@ -52,18 +61,19 @@ class REINFORCEAgentWithBaseline:
 
     def choose_action(self, state):
         if self.is_continuous:
-            action_chosen = self.policy_estimator.predict(state).detach().numpy()
+            action_chosen = self.policy_estimator.act(state)
+            self.action_log_prob = 0.0
         else:
-            action_probs = self.policy_estimator.predict(state).detach().numpy()
-            action_chosen = np.random.choice(len(action_probs), p=action_probs)
+            action_probs = self.policy_estimator.act(state)
+            action_chosen = self.action_sampler.sample(action_probs)
+            self.action_log_prob = np.log(action_probs[action_chosen])
         return action_chosen
 
     def start(self, state):
         # choosing the action to take
         current_action = self.choose_action(state)
-        self.states = np.array([state])
-        self.actions = np.array([current_action])
-        self.rewards = []
+        self.episode_buffer.reset()
+        self.episode_buffer.add_step(state, current_action, self.action_log_prob)
 
         return current_action
 
@@ -74,9 +84,8 @@ class REINFORCEAgentWithBaseline:
         #self.function_approximator.store_transition(self.states[-1], self.actions[-1], reward, state)
         #self.control()
 
-        self.rewards.append(reward)
-        self.states = np.vstack((self.states, state))
-        self.actions = np.append(self.actions, current_action)
+        self.episode_buffer.add_reward(reward)
+        self.episode_buffer.add_step(state, current_action, self.action_log_prob)
 
         #self.episode_memory.extend((reward, state, current_action))
 
@@ -86,18 +95,23 @@ class REINFORCEAgentWithBaseline:
         #self.function_approximator.store_transition(self.states[-1], self.actions[-1], reward, state)
         #self.control()
 
-        self.rewards.append(reward)
+        self.episode_buffer.add_reward(reward)
         # self.states.extend(state)
         # self.episode_memory.extend((reward, state))
 
     def learn_from_experience(self):
+        if self.update_mode == "batch":
+            self.learn_from_episode_batch()
+            return
         # TODO: probleme: comme j'ai pas ajouté le dernier état à la listes des états, on ne prend pas en compte la
         # dernière transition dans la partie DQN.
 
         discounted_reward = 0
         last_state, last_action, last_reward = None, None, None
 
-        reversed_episode = zip(self.rewards[::-1], self.states[::-1], self.actions[::-1])
+        states, actions, rewards = self.episode_buffer.get_states(), self.episode_buffer.get_actions(), \
+            self.episode_buffer.get_rewards()
+        reversed_episode = zip(rewards[::-1], states[::-1], actions[::-1])
         for reward, state, action in reversed_episode:
             #if last_state is not None:
             #    self.function_approximator.store_transition(last_state, last_action, discounted_reward, state)
@@ -120,7 +134,25 @@ class REINFORCEAgentWithBaseline:
             last_state = state
             last_action = action
 
+    def learn_from_episode_batch(self):
+        """ makes num_gradient_steps updates of the baseline and of the policy over the whole episode at once: the
+        discounted returns are computed in one vectorized pass, and the state values and the probabilities of the
+        actions taken in one forward pass each
+        """
+        states = self.episode_buffer.get_states()
+        rewards = self.episode_buffer.get_rewards()
+        returns = torch.from_numpy(compute_discounted_returns(rewards, self.discount_factor).astype(np.float32))
+        actions = torch.from_numpy(self.episode_buffer.get_actions().astype(np.int64, copy=False)).unsqueeze(1)
+        for _ in range(self.num_gradient_steps):
+            self.function_approximator.optimizer.zero_grad()
+            states_values = self.function_approximator.predict(states).view(-1)
+            δ = returns - states_values.detach()
+            value_loss = - (states_values * δ).sum()
+            value_loss.backward()
+            self.function_approximator.optimizer.step()
 
-
-
-
+            self.policy_estimator.optimizer.zero_grad()
+            actions_probs = self.policy_estimator.predict(states).gather(1, actions).squeeze(1)
+            loss = - (torch.log(actions_probs) * δ).sum()
+            loss.backward()
+            self.policy_estimator.optimizer.step()
@@ -0,0 +1,62 @@
+import numpy as np
+import torch
+import time
+
+
+class InferenceRunner:
+    """
+    Runs a network on one state at a time to choose actions, with as little overhead as possible: the state is copied
+    into a preallocated float32 tensor, the network runs under torch.inference_mode so that no autograd graph is built,
+    and its output is returned as a numpy array sharing the memory of the output tensor.
+    The latency of every call is measured, from the state given to the numpy output.
+    """
+    def __init__(self, forward_function, use_inference_mode=True):
+        self.forward_function = forward_function
+        # TorchScript functions can reuse graphs recorded with autograd, which don't accept inference tensors
+        self.use_inference_mode = use_inference_mode
+
+        self.input_tensor = None
+        self.input_array = None  # numpy view of input_tensor, in which the states are written
+
+        # latency counters, in seconds
+        self.num_calls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
+
+    def act(self, state):
+        """
+        :param state: numpy array, list or tuple
+        :return: numpy array of the output of the network
+        """
+        start_time = time.perf_counter()
+        state = np.asarray(state)
+        if self.input_array is None or self.input_array.shape != state.shape:
+            self.input_tensor = torch.zeros(state.shape, dtype=torch.float32)
+            self.input_array = self.input_tensor.numpy()
+        self.input_array[...] = state
+
+        if self.use_inference_mode:
+            with torch.inference_mode():
+                output = self.forward_function(self.input_tensor).numpy()
+        else:
+            with torch.no_grad():
+                output = self.forward_function(self.input_tensor).detach().numpy()
+
+        self.last_latency = time.perf_counter() - start_time
+        self.num_calls += 1
+        self.total_latency += self.last_latency
+        self.max_latency = max(self.max_latency, self.last_latency)
+        return output
+
+    def get_latency_stats(self):
+        """ number of calls, and mean, max and last latencies of the calls, in seconds """
+        mean_latency = self.total_latency / self.num_calls if self.num_calls > 0 else 0.0
+        return {"num_calls": self.num_calls, "mean_latency": mean_latency, "max_latency": self.max_latency,
+                "last_latency": self.last_latency}
+
+    def reset_latency_stats(self):
+        self.num_calls = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.last_latency = 0.0
@@ -1,4 +1,5 @@
 from TDAgent import *
+from TabularAgent import *
 from DQN.DQNAgent import *
 from GradientPolicyMethods.REINFORCEAgent import *
 from GradientPolicyMethods.REINFORCEAgentWithBaseline import *
@@ -115,6 +116,8 @@ class Session:
             agent = DQNAgent(agent_params)
         elif self.session_type == "tile coder test":
             agent = self.init_tc_agent(agent_params)
+        elif self.session_type == "tabular":
+            agent = self.init_tabular_agent(agent_params)
         elif self.session_type == "REINFORCE":
             agent = REINFORCEAgent(agent_params)
         elif self.session_type == "REINFORCE with baseline":
@@ -144,6 +147,24 @@ class Session:
          
         return agent
 
+    def init_tabular_agent(self, agent_params):
+        """initialization of a tabular agent, whose grid spans the observation space of the gym environment unless
+        its bounds are given in the agent parameters
+
+        Args:
+            agent_params (dict)
+
+        Returns:
+            Agent
+        """
+        assert self.environment_type == "gym", "tabular agent not supported for godot environments"
+
+        agent_params.setdefault("env_min_values", self.environment.observation_space.low)
+        agent_params.setdefault("env_max_values", self.environment.observation_space.high)
+        agent = TabularAgent(agent_params)
+
+        return agent
+
     # ====== Agent execution functions =======================================================
 
     def get_agent_action(self, state_data, reward_data=None, start=False):
@@ -208,6 +229,15 @@ class Session:
         else:
             self.agent.end(state_data, reward_data)
         
+    def close_agent(self):
+        """ releases the resources held by the agents (background threads, memory-mapped files), for the agents
+        which have some
+        """
+        agents = self.agent.values() if self.is_multiagent else [self.agent]
+        for agent in agents:
+            if hasattr(agent, "close"):
+                agent.close()
+
     def end_multiagent(state_data, reward_data):
         """send the terminal state and the final reward to every agent so they can 
         complete their last transitions
@@ -270,13 +300,16 @@ class Session:
         success = False
         rewards = np.array([])
         # run the episodes and store the rewards
-        for id_episode in range(self.num_episodes):
-            episode_reward, success = self.episode(id_episode)
-            self.environment.close()
-            print(f'EPISODE: {id_episode}')
-            print(f'reward: {episode_reward}')
-            print(f'success: {success}')
-            rewards = np.append(rewards, episode_reward)
+        try:
+            for id_episode in range(self.num_episodes):
+                episode_reward, success = self.episode(id_episode)
+                self.environment.close()
+                print(f'EPISODE: {id_episode}')
+                print(f'reward: {episode_reward}')
+                print(f'success: {success}')
+                rewards = np.append(rewards, episode_reward)
+        finally:
+            self.close_agent()
         # plot the rewards
         if self.plot is True:
             plt.plot(self.average_rewards(rewards))
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+class SparseTraces:
+    """
+    Eligibility traces of shape (num_actions, iht_size) where only the non negligible entries are stored.
+    The active entries are kept as a sorted array of flat indices and an array of values, so that decaying the traces
+    and updating the weights only costs as much as the number of active entries.
+    """
+    def __init__(self, shape, threshold=1e-4, dtype=np.float64):
+        self.shape = tuple(shape)
+        self.threshold = threshold  # entries whose absolute value falls below the threshold are dropped
+        self.dtype = dtype
+
+        self.indices = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=self.dtype)
+
+    def __len__(self):
+        return self.indices.shape[0]
+
+    def clear(self):
+        self.indices = np.empty(0, dtype=np.int64)
+        self.values = np.empty(0, dtype=self.dtype)
+
+    def flat_indices(self, action, tiles):
+        return action * self.shape[1] + np.asarray(tiles, dtype=np.int64)
+
+    def find(self, flat_indices):
+        """
+        Looks for flat indices among the active entries
+        :param flat_indices: sorted array of flat indices
+        :return: the positions of the indices in self.indices (or where they would be inserted) and a boolean mask
+        telling which ones are active
+        """
+        positions = np.searchsorted(self.indices, flat_indices)
+        is_active = positions < self.indices.shape[0]
+        is_active[is_active] = self.indices[positions[is_active]] == flat_indices[is_active]
+        return positions, is_active
+
+    def get(self, action, tiles):
+        """
+        :param action: action of the traces wanted
+        :param tiles: tiles of the traces wanted
+        :return: array containing the value of the traces of the action for every tile (0 for inactive entries)
+        """
+        flat_indices = self.flat_indices(action, tiles)
+        positions, is_active = self.find(flat_indices)
+        traces = np.zeros(flat_indices.shape[0], dtype=self.dtype)
+        traces[is_active] = self.values[positions[is_active]]
+        return traces
+
+    def update(self, action, tiles, value, cumulative=True):
+        """
+        Adds the value to the traces of the action for the given tiles, or replaces them with it if not cumulative.
+        As with a dense array, a tile appearing several times is only updated once.
+        """
+        flat_indices = np.unique(self.flat_indices(action, tiles))
+        positions, is_active = self.find(flat_indices)
+        if cumulative:
+            self.values[positions[is_active]] += value
+        else:
+            self.values[positions[is_active]] = value
+        is_new = ~is_active
+        if np.any(is_new):
+            self.indices = np.insert(self.indices, positions[is_new], flat_indices[is_new])
+            self.values = np.insert(self.values, positions[is_new], value)
+
+    def decay(self, factor):
+        """
+        Multiplies all the traces by the factor and drops the entries that became negligible
+        """
+        self.values *= factor
+        is_kept = np.abs(self.values) >= self.threshold
+        if not np.all(is_kept):
+            self.indices = self.indices[is_kept]
+            self.values = self.values[is_kept]
+
+    def add_scaled_to(self, array, scale):
+        """
+        Performs array += scale * traces, touching only the active entries
+        :param array: array of shape self.shape, modified in place
+        """
+        actions, tiles = np.divmod(self.indices, self.shape[1])
+        array[actions, tiles] += scale * self.values
+
+    def to_dense(self):
+        dense = np.zeros(self.shape, dtype=self.dtype)
+        self.add_scaled_to(dense, 1)
+        return dense
@@ -13,6 +13,8 @@ class TDAgent:
         self.traces_type = None
         self.traces = None
         self.trace_decay = None
+        self.traces_storage = None
+        self.trace_threshold = None
 
         self.control_method = None
         self.function_approximation_method = None
@@ -41,14 +43,30 @@ class TDAgent:
 
         self.traces_type = params.get("traces_type", "no traces") # can also be "eligibility traces" or "dutch traces"
         self.trace_decay = params.get("trace_decay", 0.1)
+        self.traces_storage = params.get("traces_storage", "dense") # can also be "sparse"
+        self.trace_threshold = params.get("trace_threshold", 1e-4) # sparse traces below it are dropped
 
+        self.set_other_params()
 
     def set_other_params(self):
-        self.traces = np.zeros(self.function_approximator.weights.shape)
+        self.initialize_traces()
+
+    def initialize_traces(self):
+        if self.traces_storage == "sparse":
+            self.traces = SparseTraces(self.function_approximator.weights.shape, self.trace_threshold,
+                                       self.function_approximator.compute_dtype)
+        else:
+            self.traces = np.zeros(self.function_approximator.weights.shape, dtype=self.function_approximator.compute_dtype)
 
     def initialize_function_approximator(self, params):
         self.function_approximator = FunctionApproximator(params)
 
+    def save_checkpoint(self, directory):
+        self.function_approximator.save_checkpoint(directory)
+
+    def load_checkpoint(self, directory, mmap_mode=None):
+        self.function_approximator.load_checkpoint(directory, mmap_mode)
+
     # ====== Action choice related functions =======================================================
 
     def _choose_epsilon_greedy_action(self, action_values):
@@ -122,24 +140,44 @@ class TDAgent:
                                                                                  self.previous_action])
 
     def update_eligibility_traces(self, cumulative=True):
+        tiles = self.function_approximator.get_tiles(self.previous_state)
+        if self.traces_storage == "sparse":
+            self.traces.decay(self.discount_factor * self.trace_decay)
+            self.traces.update(self.previous_action, tiles, 1, cumulative=cumulative)
+            return
         self.traces = self.discount_factor * self.trace_decay * self.traces
-        tiles = self.function_approximator.tile_coder.get_activated_tiles(self.previous_state)
         if cumulative:
             self.traces[self.previous_action, tiles] += 1
         else:
             self.traces[self.previous_action, tiles] = 1
 
     def update_dutch_traces(self):
-        tiles = self.function_approximator.tile_coder.get_activated_tiles(self.previous_state)
+        tiles = self.function_approximator.get_tiles(self.previous_state)
+        if self.traces_storage == "sparse":
+            tmp = 1 - np.sum(self.learning_rate * self.discount_factor * self.trace_decay *
+                             self.traces.get(self.previous_action, tiles))
+            self.traces.decay(self.discount_factor * self.trace_decay)
+            self.traces.update(self.previous_action, tiles, tmp)
+            return
         tmp = 1 - np.sum(self.learning_rate * self.discount_factor * self.trace_decay * self.traces[
             self.previous_action, tiles])
         self.traces = self.discount_factor * self.trace_decay * self.traces
         self.traces[self.previous_action, tiles] += tmp
 
 
+    def reset_traces(self):
+        if self.traces_type == "no traces":
+            return
+        if self.traces_storage == "sparse":
+            self.traces.clear()
+        else:
+            self.traces[:] = 0
+
     # ====== Agent core functions =======================================================
 
     def start(self, state):
+        # traces of the previous episode must not leak into this one
+        self.reset_traces()
         # getting actions
         action_values = self.function_approximator.get_action_value(state)
         # choosing the action to take
@@ -0,0 +1,141 @@
+import numpy as np
+
+
+class TabularAgent:
+    """
+    Agent storing its action values in a table. Continuous states are discretized on a regular grid spanning the
+    environment bounds, and every cell of the grid has its own row of action values in a preallocated numpy array.
+    """
+    def __init__(self, params):
+        # parameters to be set from params dict
+        self.learning_rate = None
+        self.discount_factor = None
+        self.epsilon = None
+        self.num_actions = None
+        self.is_greedy = None
+        self.control_method = None
+
+        # discretization parameters
+        self.num_bins = None
+        self.min_values = None
+        self.max_values = None
+        self.strides = None
+        self.initial_value = None
+
+        self.q_table = None
+
+        # parameters not set at initilization
+        self.previous_action = None
+        self.previous_state_index = None
+
+        self.set_params_from_dict(params)
+        self.set_other_params()
+
+    # ====== Initialization functions =======================================================
+
+    def set_params_from_dict(self, params):
+        self.discount_factor = params.get("discount_factor", 0.9)
+        self.epsilon = params.get("epsilon", 0.0)
+        self.num_actions = params.get("num_actions", 0)
+        self.learning_rate = params.get("learning_rate", 0.1)
+        self.is_greedy = params.get("is_greedy", False)
+        self.control_method = params.get("control_method", 'q-learning')
+        self.initial_value = params.get("initial_value", 0.0)
+
+        self.min_values = np.array(params.get("env_min_values"), dtype=np.float64)
+        self.max_values = np.array(params.get("env_max_values"), dtype=np.float64)
+        # number of bins along each dimension, can be given as an int or a list
+        self.num_bins = np.broadcast_to(np.array(params.get("num_bins", 20)), self.min_values.shape).astype(np.int64)
+
+    def set_other_params(self):
+        self.strides = np.concatenate(([1], np.cumprod(self.num_bins[:-1]))).astype(np.int64)
+        num_states = int(np.prod(self.num_bins))
+        self.q_table = np.full((num_states, self.num_actions), self.initial_value, dtype=np.float64)
+
+    # ====== Discretization functions =======================================================
+
+    def discretize_states(self, states):
+        """ maps each state to the index of its cell in the q table. States out of bounds go to the border cells.
+
+        Args:
+            states (np.ndarray): array of shape (N, state_dim)
+
+        Returns:
+            np.ndarray: int array of shape (N,)
+        """
+        scaled_states = (np.asarray(states, dtype=np.float64) - self.min_values) / (self.max_values - self.min_values)
+        bins = np.clip(np.floor(scaled_states * self.num_bins), 0, self.num_bins - 1).astype(np.int64)
+        return bins @ self.strides
+
+    def discretize_state(self, state):
+        return int(self.discretize_states(np.reshape(state, (1, -1)))[0])
+
+    # ====== Action choice related functions =======================================================
+
+    def _choose_epsilon_greedy_action(self, action_values):
+        """
+        choose the action with the maximum value with probability 1/epsilon, or a random action else.
+        :param action_values: list containing the action values
+        :return: int containing the value of the action chosen
+        """
+        if np.random.uniform() < self.epsilon:
+            action_chosen = np.argmax(action_values)
+        else:
+            action_chosen = np.random.randint(self.num_actions)
+        return action_chosen
+
+    def choose_action(self, action_values):
+        # choosing the action according to the strategy of the agent
+        if self.is_greedy:
+            action_chosen = np.argmax(action_values)
+        else:
+            action_chosen = self._choose_epsilon_greedy_action(action_values)
+        return action_chosen
+
+    def _get_expected_sarsa_state_value(self, action_values):
+        # same policy as in _choose_epsilon_greedy_action
+        probabilities = np.full(self.num_actions, (1 - self.epsilon) / self.num_actions)
+        probabilities[np.argmax(action_values)] += self.epsilon
+        return np.dot(probabilities, action_values)
+
+    # ====== Control related functions =======================================================
+
+    def control(self, reward, state_index=None, current_action=None, last_state=False):
+        if last_state is True:
+            target = reward
+        else:
+            action_values = self.q_table[state_index]
+            if self.control_method == 'sarsa':
+                target = reward + self.discount_factor * action_values[current_action]
+            elif self.control_method == 'q-learning':
+                target = reward + self.discount_factor * np.max(action_values)
+            elif self.control_method == 'expected sarsa':
+                target = reward + self.discount_factor * self._get_expected_sarsa_state_value(action_values)
+
+        delta = target - self.q_table[self.previous_state_index, self.previous_action]
+        self.q_table[self.previous_state_index, self.previous_action] += self.learning_rate * delta
+
+    # ====== Agent core functions =======================================================
+
+    def start(self, state):
+        state_index = self.discretize_state(state)
+        current_action = self.choose_action(self.q_table[state_index])
+
+        self.previous_action = current_action
+        self.previous_state_index = state_index
+
+        return current_action
+
+    def step(self, state, reward):
+        state_index = self.discretize_state(state)
+        current_action = self.choose_action(self.q_table[state_index])
+
+        self.control(reward, state_index, current_action)
+
+        self.previous_action = current_action
+        self.previous_state_index = state_index
+
+        return current_action
+
+    def end(self, state, reward):
+        self.control(reward, last_state=True)
@@ -0,0 +1,101 @@
+import numpy as np
+from math import floor
+
+
+class DenseTileCoder:
+    """
+    Tile coder using the same tilings as TileCoderSutton, but mapping the tiles directly to flat indices of a dense grid
+    instead of hashing them. Every tiling has (num_tiles + 1) tiles per dimension, so the coder never has collisions and
+    its size is num_tilings * prod(num_tiles + 1). Suited for low dimensional states only.
+    A single state is mapped with python numbers and precomputed tables, without the intermediate arrays of the batch
+    version: with q = num_tilings * k + r the quantized value of a dimension, the coordinate of the tile in a tiling of
+    offset o is k + (r + o) // num_tilings, whose second term only depends on r.
+    """
+    def __init__(self, params):
+        self.num_tilings = None
+        self.num_tiles = None
+        self.min_values = None
+        self.max_values = None
+
+        self.num_dims = None
+        self.size = None  # total number of tiles of the coder
+        self.tiling_size = None
+        self.strides = None
+        self.offsets = None
+        # residue_tiles[d, r, tiling]: contribution of the dimension d to the flat index of the tile of the tiling, due to
+        # the residue r of its quantized value (the offsets of the tilings are added to the first dimension)
+        self.residue_tiles = None
+        self.single_state_values = None  # (min value, num tiles, max value - min value, stride) of every dimension
+
+        self.set_params_from_dict(params)
+
+        self.set_other_params()
+
+    def set_params_from_dict(self, params):
+        self.num_tilings = params["num_tilings"]
+        self.min_values = np.array(params["min_values"], dtype=np.float64)
+        self.max_values = np.array(params["max_values"], dtype=np.float64)
+        self.num_tiles = np.broadcast_to(np.array(params["num_tiles"]), self.min_values.shape).astype(np.int64)
+
+    def set_other_params(self):
+        self.num_dims = self.min_values.shape[0]
+        tiles_per_dim = self.num_tiles + 1
+        self.tiling_size = int(np.prod(tiles_per_dim))
+        self.size = self.num_tilings * self.tiling_size
+        self.strides = np.concatenate(([1], np.cumprod(tiles_per_dim[:-1]))).astype(np.int64)
+        # asymmetric displacement of the tilings (1, 3, 5, ... as in Sutton's tiles), kept lower than one tile so that
+        # every coordinate lies in [0; num_tiles]
+        tilings = np.arange(self.num_tilings, dtype=np.int64)
+        self.offsets = (tilings[:, None] * (1 + 2 * np.arange(self.num_dims, dtype=np.int64))) % self.num_tilings
+
+        residues = np.arange(self.num_tilings, dtype=np.int64)
+        self.residue_tiles = ((residues[None, :, None] + self.offsets.T[:, None, :]) // self.num_tilings) * \
+                             self.strides[:, None, None]
+        self.residue_tiles[0] += tilings * self.tiling_size
+        self.single_state_values = list(zip(self.min_values.tolist(), self.num_tiles.tolist(),
+                                            (self.max_values - self.min_values).tolist(), self.strides.tolist()))
+
+    def get_activated_tiles(self, values):
+        num_tilings = self.num_tilings
+        base_index = 0  # part of the flat index shared by all the tilings
+        residues = []
+        for value, (min_value, num_tiles, value_range, stride) in zip(np.asarray(values).tolist(),
+                                                                       self.single_state_values):
+            # rescaling the value so it is in the interval [0; num_tiles], and quantizing it
+            qvalue = floor(min(max(((value - min_value) * num_tiles) / value_range, 0), num_tiles) * num_tilings)
+            base_index += (qvalue // num_tilings) * stride
+            residues.append(qvalue % num_tilings)
+        tiles_activated = self.residue_tiles[0, residues[0]] + base_index
+        for dim in range(1, self.num_dims):
+            tiles_activated += self.residue_tiles[dim, residues[dim]]
+        return tiles_activated
+
+    def get_activated_tiles_batch(self, states, readonly=False):
+        """ Maps states to the flat indices of the tiles they activate.
+
+        Args:
+            states (np.ndarray): array of shape (N, dims) containing N states
+            readonly (bool, optional): only there for compatibility with TileCoderSutton, the grid is never modified.
+
+        Returns:
+            np.ndarray: int array of shape (N, num_tilings) containing the tiles activated by each state
+        """
+        # rescaling the values so they are in the interval [0; num_tiles], values out of bounds go to the border tiles
+        scaled_states = ((np.asarray(states, dtype=np.float64) - self.min_values) * self.num_tiles) / \
+                        (self.max_values - self.min_values)
+        scaled_states = np.clip(scaled_states, 0, self.num_tiles)
+        qstates = np.floor(scaled_states * self.num_tilings).astype(np.int64)
+        coords = (qstates[:, None, :] + self.offsets) // self.num_tilings
+        tiles_activated = coords @ self.strides + np.arange(self.num_tilings, dtype=np.int64) * self.tiling_size
+        return tiles_activated
+
+
+if __name__ == "__main__":
+    tile_coder = DenseTileCoder({
+        'num_tilings': 8,
+        'num_tiles': 8,
+        'min_values': [-0.6, -0.07],
+        'max_values': [1, 0.07]
+    })
+    tiles_values = tile_coder.get_activated_tiles([0, 0])
+    print(tile_coder.size, tiles_values)
@@ -1,5 +1,6 @@
 from math import floor, log
 from itertools import zip_longest
+import numpy as np
 
 basehash = hash
 
@@ -7,6 +8,7 @@ basehash = hash
 class IHT:
     ""
     "Structure to handle collisions, by Richard Sutton"
+    ARRAYS_NAMES = ("keys", "values")
 
     def __init__(self, iht_size):
         self.size = iht_size
@@ -42,12 +44,75 @@ class IHT:
             d[obj] = count
             return count
 
+    def get_arrays(self):
+        """returns the content of the table as an (n, num_coords) int array of coordinates and an (n,) int array
+        of their indices"""
+        if len(self.dictionary) == 0:
+            return np.empty((0, 0), dtype=np.int64), np.empty(0, dtype=np.int64)
+        keys = np.array(list(self.dictionary.keys()), dtype=np.int64)
+        values = np.fromiter(self.dictionary.values(), dtype=np.int64, count=len(self.dictionary))
+        return keys, values
+
+    def set_arrays(self, keys, values):
+        """fills the table with arrays returned by get_arrays"""
+        self.dictionary = dict(zip(map(tuple, np.asarray(keys).tolist()), np.asarray(values).tolist()))
+
+    def getindexlist(self, coordinates_list, readonly=False):
+        """returns the indices of a list of coordinates tuples, looking the known ones up directly in the
+        dictionary"""
+        d = self.dictionary
+        getindex = self.getindex
+        return [index if (index := d.get(coords)) is not None else getindex(coords, readonly)
+                for coords in coordinates_list]
+
+    def getindices(self, coordinates, readonly=False):
+        """batch version of getindex: returns the indices of every row of an (M, num_coords) int array of
+        coordinates. Missing coordinates in readonly mode are given the index -1."""
+        indices = self.getindexlist(map(tuple, coordinates.tolist()), readonly)
+        if readonly:
+            indices = [-1 if index is None else index for index in indices]
+        return np.array(indices, dtype=np.int64)
+
     @staticmethod
     def hashcoords(coordinates, m, readonly=False):
         if type(m) == IHT: return m.getindex(tuple(coordinates), readonly)
         if type(m) == int: return basehash(tuple(coordinates)) % m
         if m == None: return coordinates
 
+    @staticmethod
+    def hashcoords_batch(coordinates, m, readonly=False):
+        """hashes an (..., num_coords) array of coordinates, returns an int array of shape (...)"""
+        if m is None: return coordinates
+        flat_coordinates = coordinates.reshape(-1, coordinates.shape[-1])
+        if type(m) == int:
+            indices = np.array([basehash(tuple(coords)) % m for coords in flat_coordinates.tolist()], dtype=np.int64)
+        else:
+            indices = m.getindices(flat_coordinates, readonly)
+        return indices.reshape(coordinates.shape[:-1])
+
+    @staticmethod
+    def tiles_coordinates(numtilings, floats, ints=[]):
+        """returns an (N, numtilings, 1 + dims + len(ints)) int array containing, for each of the N rows of the
+        (N, dims) floats array, the coordinates of the tile activated in every tiling"""
+        floats = np.asarray(floats, dtype=np.float64)
+        num_states, num_dims = floats.shape
+        qfloats = np.floor(floats * numtilings).astype(np.int64)
+        tilings = np.arange(numtilings, dtype=np.int64)
+        # offset of the tiling along each dimension: tiling * (1 + 2 * dim)
+        offsets = tilings[:, None] * (1 + 2 * np.arange(num_dims, dtype=np.int64))
+        coords = np.empty((num_states, numtilings, 1 + num_dims + len(ints)), dtype=np.int64)
+        coords[:, :, 0] = tilings
+        coords[:, :, 1:1 + num_dims] = (qfloats[:, None, :] + offsets) // numtilings
+        coords[:, :, 1 + num_dims:] = ints
+        return coords
+
+    @staticmethod
+    def tiles_batch(ihtORsize, numtilings, floats, ints=[], readonly=False):
+        """returns an (N, numtilings) int array of tile indices corresponding to each row of the (N, dims) floats
+        array and to the ints. In readonly mode, tiles not found in the IHT get the index -1."""
+        coords = IHT.tiles_coordinates(numtilings, floats, ints)
+        return IHT.hashcoords_batch(coords, ihtORsize, readonly)
+
     @staticmethod
     def tiles(ihtORsize, numtilings, floats, ints=[], readonly=False):
         """returns num-tilings tile indices corresponding to the floats and ints"""
@@ -18,6 +18,7 @@ class TileCoder:
         self.tilings_delta = None
         self.tilings_origins = None
         self.is_action_in_dims = None
+        self.strides = None
 
         self.set_params_from_dict(params)
         self.check_initialization_input()
@@ -49,6 +50,8 @@ class TileCoder:
         self.tilings_absolute_origin = self.min_values - self.tile_size
         self.tiling_size = np.prod(self.num_tiles)
         self.tilings_delta = self.tile_size / self.num_tilings
+        # value added to the index of a tile when moving by one tile along each dimension
+        self.strides = np.concatenate(([1], np.cumprod(self.num_tiles[:-1]))).astype(int)
         self.set_tilings_origins()
 
     def set_tilings_origins(self):
@@ -63,21 +66,34 @@ class TileCoder:
 
         values = self.check_format_input_values(values)
 
-        tile_activated = np.zeros([self.num_tilings, self.num_dim])
-        for n_tiling in range(self.num_tilings):
-            for n_dim in range(self.num_dim):
-                for n_tile in range(self.num_tiles[n_dim]):
-                    if values[n_dim] >= self.tilings_origins[n_tiling, n_dim] + n_tile * self.tile_size[n_dim]:
-                        tile_activated[n_tiling, n_dim] = n_tile
-
-        tiling_values = np.zeros(self.num_tilings)
-        for n_tiling in range(self.num_tilings):
-            for n_dim in range(self.num_dim):
-                tiling_values[n_tiling] += tile_activated[n_tiling, n_dim] * np.prod(self.num_tiles[:n_dim])
-
-        tiling_values = tiling_values.astype(int)
+        return self.get_tilings_values_batch(values[np.newaxis])[0]
 
-        return tiling_values
+    def get_tiles_activated(self, values, dims=slice(None)):
+        """
+        Computes, for every tiling, the tile activated along each dimension. The tile activated is the last one whose
+        origin is lower or equal to the value, or the first one if there is none.
+        :param values: array of shape (N, num_dims_selected)
+        :param dims: dimensions of the tile coder the values correspond to
+        :return: int array of shape (N, num_tilings, num_dims_selected)
+        """
+        origins = self.tilings_origins[:, dims]
+        tile_size = self.tile_size[dims]
+        values = values[:, np.newaxis, :]
+        tile_activated = np.floor((values - origins) / tile_size)
+        # correcting the rounding errors of the division so that the comparisons are the same as origin + n * size
+        tile_activated -= values < origins + tile_activated * tile_size
+        tile_activated += values >= origins + (tile_activated + 1) * tile_size
+        return np.clip(tile_activated, 0, self.num_tiles[dims] - 1).astype(int)
+
+    def get_tilings_values_batch(self, values):
+        """
+        Vectorized version of get_tilings_values.
+        :param values: array of shape (N, num_dims)
+        :return: int array of shape (N, num_tilings) containing the tile activated by each input in every tiling
+        """
+        values = np.asarray(values, dtype=float)
+        tile_activated = self.get_tiles_activated(values)
+        return tile_activated @ self.strides
 
     def check_format_input_values(self, values):
         if not isinstance(values, np.ndarray):
@@ -97,15 +113,32 @@ class TileCoder:
 
         return params
 
-    def get_best_action(self, state, weights):
-        action_values = np.array([])
+    def get_action_values(self, states, weights):
+        """
+        Evaluates all the actions for one state or a batch of states at once. The action must be the last dimension
+        of the tile coder.
+        :param states: array of shape (num_dims - 1,) or (N, num_dims - 1)
+        :param weights: array of weights, indexed by the tilings values
+        :return: array of shape (num_actions,) or (N, num_actions) containing the action values
+        """
+        states = np.asarray(states, dtype=float)
+        is_single_state = states.ndim == 1
+        states = np.atleast_2d(states)
         # TODO : change num_tiles[-1], find a way to explicitly use the number of actions
-        for action in range(self.num_tiles[-1]):
-            tiles_values = self.get_tilings_values(np.append(state, action))
-            #print(tiles_values)
-            action_value = np.sum(weights[tiles_values])
-            action_values = np.append(action_values, action_value)
-        return np.argmax(action_values)
+        actions = np.arange(self.num_tiles[-1], dtype=float)
+
+        # the part of the index coming from the state is shared by all actions
+        states_values = self.get_tiles_activated(states, slice(None, -1)) @ self.strides[:-1]
+        actions_values = self.get_tiles_activated(actions[:, np.newaxis], slice(-1, None))[..., 0] * self.strides[-1]
+        tiles_values = states_values[:, np.newaxis, :] + actions_values[np.newaxis]
+
+        action_values = np.sum(weights[tiles_values], axis=-1)
+        if is_single_state:
+            action_values = action_values[0]
+        return action_values
+
+    def get_best_action(self, state, weights):
+        return np.argmax(self.get_action_values(state, weights))
 
     def choose_epsilon_greedy_action(self, state, weights, epsilon):
         best_action = self.get_best_action(state, weights)
@@ -1,5 +1,7 @@
 import numpy as np
+from math import floor
 from TileCoder.IHT import *
+from TileCoder.ArrayIHT import *
 
 class TileCoderSutton:
     def __init__(self, params):
@@ -9,6 +11,12 @@ class TileCoderSutton:
         self.num_tiles = None
         self.min_values = None
         self.max_values = None
+        self.iht_type = None
+        self.index_dtype = None
+        self.coordinate_dtype = None
+        self.tilings_offsets = None  # offsets of every tiling along every dimension, of shape (num_tilings, dims)
+        self.coordinates_buffer = None  # coordinates of the tiles of one state, the first column being the tiling
+        self.scaling_values = None  # (min value, num tiles, max value - min value) of every dimension
 
         self.set_params_from_dict(params)
 
@@ -20,17 +28,59 @@ class TileCoderSutton:
         self.num_tiles = params["num_tiles"]
         self.min_values = np.array(params["min_values"])
         self.max_values = np.array(params["max_values"])
+        # can also be "array", which takes less memory and maps batches faster, but single states slower
+        self.iht_type = params.get("iht_type", "dictionary")
+        self.index_dtype = params.get("index_dtype", np.int64)  # integer type of the indices of the array IHT
+        self.coordinate_dtype = params.get("coordinate_dtype", np.int32)  # integer type of its coordinates
 
     def set_other_params(self):
-        self.iht = IHT(self.max_size)
+        if self.iht_type == "array":
+            self.iht = ArrayIHT(self.max_size, self.index_dtype, self.coordinate_dtype)
+        else:
+            self.iht = IHT(self.max_size)
+
+        num_dims = self.min_values.shape[0]
+        tilings = np.arange(self.num_tilings, dtype=np.int64)
+        self.tilings_offsets = tilings[:, None] * (1 + 2 * np.arange(num_dims, dtype=np.int64))
+        self.coordinates_buffer = np.empty((self.num_tilings, 1 + num_dims), dtype=np.int64)
+        self.coordinates_buffer[:, 0] = tilings
+        self.scaling_values = list(zip(self.min_values.tolist(), np.broadcast_to(self.num_tiles, (num_dims,)).tolist(),
+                                       (self.max_values - self.min_values).tolist()))
 
     def get_activated_tiles(self, values):
         """ It is important to remember that the scaling has for only purpose to make the range of the values equal to
         the number of tiles along the dimension.
+        Single states are the most frequent queries, so they skip the intermediate arrays of the batch version: the
+        few scaled values are computed with python numbers, and the coordinates are written in a preallocated array,
+        which is given as it is to the array IHT, or looked up one row at a time in the dictionary.
+        """
+        num_tilings = self.num_tilings
+        # rescaling the values so they are in the interval [0; num_tiles], and quantizing them
+        qfloats = [floor(((value - min_value) * num_tiles) / value_range * num_tilings)
+                   for value, (min_value, num_tiles, value_range) in zip(np.asarray(values).tolist(),
+                                                                          self.scaling_values)]
+        np.floor_divide(np.add(self.tilings_offsets, qfloats, out=self.coordinates_buffer[:, 1:]), num_tilings,
+                        out=self.coordinates_buffer[:, 1:])
+        if type(self.iht) == ArrayIHT:
+            return self.iht.getindices(self.coordinates_buffer)
+        coordinates = map(tuple, self.coordinates_buffer.tolist())
+        return np.array(self.iht.getindexlist(coordinates), dtype=np.int64)
+
+    def get_activated_tiles_batch(self, states, readonly=False):
+        """ Vectorized version of get_activated_tiles.
+
+        Args:
+            states (np.ndarray): array of shape (N, dims) containing N states
+            readonly (bool, optional): if True, tiles that are not in the IHT yet are not added to it and get the
+                                       index -1. Defaults to False.
+
+        Returns:
+            np.ndarray: int array of shape (N, num_tilings) containing the tiles activated by each state
         """
         # rescaling the values so they are in the interval [0; num_tiles]
-        scaled_values = list(((np.array(values) - self.min_values) * self.num_tiles) / (self.max_values - self.min_values))
-        tiles_activated = IHT.tiles(self.iht, self.num_tilings, scaled_values)
+        scaled_states = ((np.asarray(states, dtype=np.float64) - self.min_values) * self.num_tiles) / \
+                        (self.max_values - self.min_values)
+        tiles_activated = IHT.tiles_batch(self.iht, self.num_tilings, scaled_states, readonly=readonly)
         return tiles_activated
 
 
@@ -0,0 +1,42 @@
+import numpy as np
+import timeit
+from TileCoder.TileCoderSutton import *
+from TileCoder.DenseTileCoder import *
+
+
+def make_tile_coder(tile_coder_type, num_tilings, num_tiles, num_dims):
+    params = {
+        'num_tilings': num_tilings,
+        'num_tiles': num_tiles,
+        'min_values': [0] * num_dims,
+        'max_values': [1] * num_dims
+    }
+    if tile_coder_type == "dense":
+        return DenseTileCoder(params)
+    params['max_size'] = 2 ** 20
+    return TileCoderSutton(params)
+
+
+def benchmark(tile_coder_type, num_tilings=8, num_tiles=8, num_dims=2, num_states=1000, seed=0):
+    """
+    Measures the time taken by a tile coder to map states one at a time, as TDAgent does at every step, once all their
+    tiles have been seen (so that the Sutton tile coder doesn't insert anything), and to map them as a batch.
+    :return: time of a single state in microseconds, time of a batch in milliseconds
+    """
+    rng = np.random.default_rng(seed)
+    states = rng.random((num_states, num_dims))
+    tile_coder = make_tile_coder(tile_coder_type, num_tilings, num_tiles, num_dims)
+    tile_coder.get_activated_tiles_batch(states)
+
+    single_time = min(timeit.repeat(lambda: [tile_coder.get_activated_tiles(state) for state in states],
+                                    number=1, repeat=5)) / num_states * 1e6
+    batch_time = min(timeit.repeat(lambda: tile_coder.get_activated_tiles_batch(states), number=1, repeat=5)) * 1e3
+    return single_time, batch_time
+
+
+if __name__ == "__main__":
+    for num_tilings, num_tiles, num_dims in [(8, 8, 2), (8, 8, 4), (32, 4, 4)]:
+        print(f"{num_tilings} tilings, {num_tiles} tiles, {num_dims} dimensions")
+        for tile_coder_type in ["sutton", "dense"]:
+            single_time, batch_time = benchmark(tile_coder_type, num_tilings, num_tiles, num_dims)
+            print(f"  {tile_coder_type:>6}: single state {single_time:6.1f} us, batch of 1000 states {batch_time:6.1f} ms")
@@ -0,0 +1,54 @@
+import numpy as np
+import tracemalloc
+import timeit
+from TileCoder.TileCoderSutton import *
+
+
+def make_tile_coder(iht_type, iht_size, num_tilings, num_dims):
+    # about twice as many tiles as the size of the IHT, so that random states can fill it
+    num_tiles = int(np.ceil((2 * iht_size / num_tilings) ** (1 / num_dims)))
+    return TileCoderSutton({
+        'max_size': iht_size,
+        'num_tilings': num_tilings,
+        'num_tiles': num_tiles,
+        'min_values': [0] * num_dims,
+        'max_values': [1] * num_dims,
+        'iht_type': iht_type
+    })
+
+
+def benchmark(iht_type, iht_size=2 ** 20, num_tilings=8, num_dims=4, num_states=1000, seed=0):
+    """
+    Fills the IHT of a tile coder with the tiles of random states, then measures the memory it takes and the time of
+    the lookups of a single state and of a batch of num_states states, which are all in the IHT.
+    The array IHT is smaller and faster on batches, but slower on single states, as mapped by TDAgent at every step.
+    :return: number of tiles in the IHT, memory in MB, time of a single state lookup in microseconds, time of a batch
+    lookup in milliseconds
+    """
+    rng = np.random.default_rng(seed)
+    filling_states = rng.random((iht_size // num_tilings, num_dims))
+
+    tracemalloc.start()
+    tile_coder = make_tile_coder(iht_type, iht_size, num_tilings, num_dims)
+    for start in range(0, filling_states.shape[0], 10000):
+        tile_coder.get_activated_tiles_batch(filling_states[start:start + 10000])
+    memory = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+
+    states = filling_states[rng.integers(filling_states.shape[0], size=num_states)]
+    single_time = min(timeit.repeat(lambda: [tile_coder.get_activated_tiles(state) for state in states],
+                                    number=1, repeat=5)) / num_states * 1e6
+    batch_time = min(timeit.repeat(lambda: tile_coder.get_activated_tiles_batch(states), number=1, repeat=5)) * 1e3
+    return tile_coder.iht.count(), memory, single_time, batch_time
+
+
+if __name__ == "__main__":
+    for num_tilings, num_dims in [(8, 2), (8, 4), (32, 4)]:
+        print(f"iht_size=2**20, {num_tilings} tilings, {num_dims} dimensions")
+        single_times = {}
+        for iht_type in ["dictionary", "array"]:
+            count, memory, single_time, batch_time = benchmark(iht_type, num_tilings=num_tilings, num_dims=num_dims)
+            single_times[iht_type] = single_time
+            print(f"  {iht_type:>10}: {count} tiles, {memory:6.1f} MB, single state {single_time:6.1f} us, "
+                  f"batch of 1000 states {batch_time:6.1f} ms")
+        print(f"  single state: array / dictionary = {single_times['array'] / single_times['dictionary']:.2f}")
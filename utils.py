@@ -1,5 +1,6 @@
 import os
 import json
+import numpy as np
 
 def get_params(file_name):
     complete_path = make_full_params_path(file_name)
@@ -37,3 +38,27 @@ def get_path(string_path, add_absolute=False):
     else:
         modified_string_path = os.path.join(*string_path.split("/"))
     return modified_string_path
+
+def compute_discounted_returns(rewards, discount_factor):
+    """ discounted returns G_t = r_t + discount_factor * G_t+1 of every step of an episode, without a loop over the
+    steps. The rewards weighted by the powers of the discount factor are summed backward with a cumulative sum, over
+    blocks short enough for these powers not to underflow.
+
+    Returns:
+        np.ndarray: float64 array of the same length as rewards
+    """
+    rewards = np.asarray(rewards, dtype=np.float64)
+    if discount_factor == 0:
+        return rewards.copy()
+    num_steps = rewards.shape[0]
+    block_size = max(1, num_steps if discount_factor >= 1 else int(-200 / np.log10(discount_factor)))
+    returns = np.empty(num_steps, dtype=np.float64)
+    next_return = 0.0  # return of the step following the block
+    for end in range(num_steps, 0, -block_size):
+        start = max(0, end - block_size)
+        powers = discount_factor ** np.arange(end - start, dtype=np.float64)
+        weighted_rewards = rewards[start:end] * powers
+        returns[start:end] = (weighted_rewards[::-1].cumsum()[::-1] + powers[-1] * discount_factor * next_return) / \
+            powers
+        next_return = returns[start]
+    return returns